@@ -1,242 +1,11 @@
-import os
-import json
-import logging
-import requests
-from datetime import datetime, timezone, timedelta
-from bs4 import BeautifulSoup
-import re
-import io
-import sys
-import time
-from logging.handlers import RotatingFileHandler
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from urllib.parse import quote
-from fake_useragent import UserAgent
-    
-with open('scripts/bid.json', 'r', encoding='utf-8') as f:
-    bid = json.load(f) 
-    keyword_main = bid["keyword"]["main"]
-    keyword_others = bid["keyword"]["others"]
-    keyword_list = keyword_main + keyword_others
-    not_list = bid["keyword"]["not"]
+# 有德招标：单站点入口，抓取、过滤、推送统一由 bid_engine 执行
+from bid_engine import run
 
-key = os.getenv("key_jk")
-key_test = os.getenv("key_test")
 com_key = "有德招标"
 
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
-# 确保日志目录存在
-log_dir = "scripts/output"
-os.makedirs(log_dir, exist_ok=True)  # 自动创建目录
-
-# 配置日志
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-
-# 创建文件处理器（输出到scripts/output/bid_log.log）
-log_file = os.path.join(log_dir, "bid_log.log")
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
-
-# 保留控制台输出（可选）
-console_handler = logging.StreamHandler()
-logger.addHandler(console_handler)
-
-# 替换FileHandler为RotatingFileHandler（保留3个备份，每个10MB）
-file_handler = RotatingFileHandler(
-    log_file, 
-    maxBytes=10 * 1024 * 1024,  # 10MB
-    backupCount=3,
-    encoding='utf-8'
-)
-
-# 配置重试策略
-retry_strategy = Retry(
-    total=3,                              # 总尝试次数（含首次请求）[2,4](@ref)
-    backoff_factor=1,                     # 指数退避间隔：{backoff_factor} * 2^(n-1)秒[4,5](@ref)
-    status_forcelist=[500, 502, 503, 504],# 遇到这些状态码自动重试[3,5](@ref)
-    allowed_methods=["GET", "POST"]       # 仅对指定HTTP方法重试[4](@ref)
-)
-
-try:
-    response = requests.get("https://api.ipify.org", timeout=10)
-    logger.info(f"当前代理IP: {response.text}")
-except Exception as e:
-    logger.info(f"代理请求失败: {e}")
-    
-class WeComWebhook:  
-    BASE_URL = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key={key}"
-    def __init__(self):
-        self.webhook_key = key
-        if not self.webhook_key:
-            logger.error("未检测到环境变量 WECOM_WEBHOOK_KEY")
-            raise ValueError("缺失密钥")
-
-    def send_text(self, content: str) -> dict:
-        payload = {"msgtype": "text", "text": {"content": content}}
-        try:
-            response = requests.post(
-                self.BASE_URL.format(key=self.webhook_key),
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logger.error(f"消息发送失败: {str(e)}")
-            return {"errcode": -1, "errmsg": "请求异常"}
-
-class WeComWebhookTest:  
-    BASE_URL = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key={key}"
-    def __init__(self):
-        self.webhook_key = key_test
-        if not self.webhook_key:
-            logger.error("未检测到环境变量 WECOM_WEBHOOK_KEY_TEST")
-            raise ValueError("缺失密钥")
-
-    def send_text(self, content: str) -> dict:
-        payload = {"msgtype": "text", "text": {"content": content}}
-        try:
-            response = requests.post(
-                self.BASE_URL.format(key=self.webhook_key),
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logger.error(f"消息发送失败: {str(e)}")
-            return {"errcode": -1, "errmsg": "请求异常"}
-
-def get_random_user_agent():
-    ua = UserAgent()
-    return ua.random
-    
-def search(keyword, start_time):
-    session = requests.Session()
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("https://", adapter)
-    # home_url = "http://www.youde.net/yd_zbcg/portal/index"
-    # try:
-    #     home_response = session.post(home_url)
-    #     home_response.raise_for_status()
-
-    # except Exception as e:
-    #         logger.error(f"{com_key}，主页请求失败: {str(e)}")
-    #         return None
-
-    headers = {
-        'User-Agent': get_random_user_agent(),
-        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-    }
-
-    # headers = {
-    #     'Accept': 'application/json, text/javascript, */*; q=0.01',
-    #     'Accept-Encoding': 'gzip, deflate',
-    #     'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,ar;q=0.7',
-    #     'Content-Length': '44',
-    #     'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-    #     'Cookie': 'JSESSIONID=17BF927452F2661B5CFD7BCD8DB16F20',
-    #     'Host': 'www.youde.net',
-    #     'Origin': 'http://www.youde.net',
-    #     'Proxy-Connection': 'keep-alive',
-    #     'Referer': 'http://www.youde.net/yd_zbcg/portal/toSearchArticle?title=%E5%9F%B9%E8%AE%AD',
-    #     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
-    #     'X-Requested-With': 'XMLHttpRequest'
-    # }
-
-    api_url = f"http://www.youde.net/yd_zbcg/portal/getArticleByType"
-    payload = {
-        "title": keyword
-    }
-    bid_list = []
-    try:
-        response = session.post(
-            url=api_url,
-            headers=headers,
-            data=payload,
-            timeout=60
-        )
-        response.raise_for_status()
-        
-        data = response.json()
-        # logger.info(f"data: {data}")
-        data_list = data['obj']['rows']
-        for list in data_list:
-            format_str = "%Y-%m-%d %H:%M:%S"
-            bid_time = datetime.strptime(list['publishedTime'], format_str)
-            if bid_time >= start_time.replace(tzinfo=None):
-                bid = {
-                    "标题": list['title'],
-                    "链接":  f"http://www.youde.net/yd_zbcg/portal/toDetail?articleId={list['articleId']}"
-                }
-                bid_list.append(bid)
-            else:
-                break
-
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"{com_key}，API请求失败: 状态码 {response.status_code}, 响应内容: {response.text}")
-        return None
-    
-    return bid_list
-
 def lambda_handler(event, context):
     """Lambda入口函数"""
-    logger.info("【调试】函数开始执行")
-    webhook = WeComWebhook()
-    webhook_test = WeComWebhookTest()
-    logger.info("【调试】Webhook初始化成功")
-    
-    utc_now = datetime.now(timezone.utc)
-    beijing_time = utc_now.astimezone(timezone(timedelta(hours=8)))        
-    end_time = beijing_time + timedelta(hours=5.95)
-    logger.info(f"end_time: {end_time}")
-    send_test = webhook_test.send_text(f"重启，必胜！{com_key}, {beijing_time}")
-    logger.info(f"重启，必胜！\n {beijing_time}")
-    
-    bid_total = []
-    while beijing_time <= end_time:
-        try:
-            # start_time = beijing_time - timedelta(days=10)
-            start_time = beijing_time - timedelta(minutes=20)
-            logger.info(f"start_time: {start_time}")
-            for keyword in keyword_list:
-                result = search(keyword, start_time)
-                message = ''
-                for msg in result:
-                    if msg not in bid_total:
-                        if any(notword in msg['标题'] for notword in not_list):
-                            logger.info(f"keyword：{keyword}，msg['标题']：{msg['标题']}")
-                            continue
-                        else:
-                            bid_total.append(msg)
-                            logger.info(f"keyword：{keyword}，msg['标题']：{msg['标题']}")
-                            message = message + f"【标题】{msg['标题']}\n【链接】{msg['链接']}\n\n"
-                
-                if message != '':
-                    message = message[:-2]
-                    result = webhook.send_text(message)
-                    # result_test = webhook_test.send_text(message)
-                    time.sleep(5)
-                else:
-                    time.sleep(5)
-                    continue
-        
-        except Exception as e:
-            logger.error(f"全局异常: {str(e)}")
-            error_send = webhook_test.send_text(f"{com_key}，全局异常: {str(e)}")
-            
-        if len(bid_total) >= 20:
-            bid_total = bid_total[-6:]
-            
-        beijing_time = datetime.now(timezone(timedelta(hours=8)))
+    run(["ydzb"], log_name=com_key)
 
-    now_time = beijing_time.strftime("%Y-%m-%d %H:%M:%S")
-    time_send = webhook_test.send_text(f"归零，更新！{com_key},{now_time}")
-    logger.info(f"归零，更新！\n{now_time}")
-    
 if __name__ == "__main__":
     func = lambda_handler("", "")
@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from bid_common import get_user_agent_pool
+import bid_html
+import bid_nextdata
+from bid_record import Announcement, parse_ts
+
+
+def measure(func, number):
+    """返回 (每次调用耗时 µs, 每次调用分配的字节数)"""
+    func()
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[1]
+    for _ in range(min(number, 100)):
+        func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed / number * 1e6, (peak - before) / min(number, 100)
+
+
+def report(name, us, nbytes):
+    print(f"{name:<32} {us:>12.2f} µs/次 {nbytes:>12.0f} B/次")
+
+
+def bench_ua(args):
+    pool = get_user_agent_pool()
+    report(f"UserAgentPool.next ({len(pool.agents)} 条)", *measure(pool.next, args.number))
+    try:
+        from fake_useragent import UserAgent
+    except ImportError:
+        print("fake_useragent 未安装，跳过对比")
+        return
+    # 原脚本每次搜索都构造一次 UserAgent()
+    report("UserAgent().random", *measure(lambda: UserAgent().random, max(1, args.number // 1000)))
+
+
+def synthetic_ghcg_page(rows=200, today=None):
+    """生成与 zgguohe search.php 结构一致的页面：页头导航 + div.g_ryzs ul.g_bule li 结果行，每 20 行早一天"""
+    today = today or date.today()
+    nav = "".join(f'<li><a href="list.php?c={i}">栏目{i}</a></li>' for i in range(60))
+    items = "".join(
+        f'<li><span class="fr">{today - timedelta(days=i // 20)}</span>'
+        f'<a href="show.php?id={100000 + i}" target="_blank">关于2025年第{i}批培训服务项目的采购公告</a></li>'
+        for i in range(rows)
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>搜索</title>'
+        + '<script>var x = 1;</script>' * 20 + '</head><body>'
+        + f'<div class="g_head"><ul class="nav">{nav}</ul></div>'
+        + f'<div class="g_main"><div class="g_ryzs"><ul class="g_bule">{items}</ul></div></div>'
+        + '<div class="g_foot">' + '<p>版权所有</p>' * 50 + '</div></body></html>'
+    )
+
+
+def ghcg_rows_bs4(html):
+    """原 Bid_ghcg_m.py 的解析路径：整页 BeautifulSoup，先建 tender_list 再按日期过滤"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    tender_list = []
+    for li in soup.select('div.g_ryzs ul.g_bule li'):
+        a_tag = li.find('a')
+        if not a_tag:
+            continue
+        date_span = li.find('span', class_='fr')
+        publishedTime = date_span.get_text(strip=True) if date_span else None
+        tender_list.append((a_tag.text.strip(), publishedTime, a_tag['href']))
+    return tender_list
+
+
+def take_until(rows, start):
+    """与适配器相同的过滤：读到早于 start 的行即停止"""
+    kept = []
+    for title, published, href in rows:
+        if published is None:
+            continue
+        if date.fromisoformat(published) < start:
+            break
+        kept.append((title, published, href))
+    return kept
+
+
+def profile_page(func, repeat):
+    """返回 (每页 CPU 毫秒, 峰值内存 KB, 结果)"""
+    result = func()
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    cpu = (time.process_time() - start) / repeat * 1000
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return cpu, peak / 1024, result
+
+
+def load_recorded(pages_dir, site, endpoint, text=False):
+    """读 bid_replay 的录制目录：<目录>/<站点>/NNNN.json 为元数据，NNNN.body 为响应体。
+    只取接口包含 endpoint、状态为 200 的响应；pages_dir 也可以直接是站点目录"""
+    site_dir = os.path.join(pages_dir, site)
+    if not os.path.isdir(site_dir):
+        site_dir = pages_dir
+    pages = []
+    for meta_path in sorted(glob.glob(os.path.join(site_dir, "*.json"))):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("status") != 200 or endpoint not in meta.get("endpoint", ""):
+            continue
+        body_path = meta_path[:-len(".json")] + ".body"
+        with open(body_path, 'rb') as f:
+            content = f.read()
+        pages.append((os.path.basename(body_path), content.decode("utf-8", errors="replace") if text else content))
+    if not pages:
+        print(f"{site_dir} 下没有 {endpoint} 的录制响应")
+    return pages
+
+
+def bench_ghcg(args):
+    if args.pages:
+        pages = load_recorded(args.pages, "ghcg", "/search.php", text=True)
+    else:
+        pages = [(f"synthetic-{args.rows}", synthetic_ghcg_page(args.rows))]
+    start = date.today() - timedelta(days=args.days - 1)
+    parsers = [("bs4 全页解析", lambda html: take_until(ghcg_rows_bs4(html), start))]
+    if bid_html.get_etree() is not None:
+        parsers.append(("lxml 增量", lambda html: take_until(bid_html._iter_rows_lxml(bid_html.container_fragment(html)), start)))
+    parsers.append(("标准库增量", lambda html: take_until(bid_html._iter_rows_stdlib(bid_html.container_fragment(html)), start)))
+    print(f"{'页面':<24} {'解析器':<12} {'CPU ms/页':>10} {'峰值内存 KB':>12} {'行数':>6}")
+    for name, html in pages:
+        baseline = None
+        for label, parse in parsers:
+            cpu, peak, rows = profile_page(lambda: parse(html), args.repeat)
+            if baseline is None:
+                baseline = rows
+            elif rows != baseline:
+                print(f"  警告：{label} 的结果与 bs4 不一致")
+            print(f"{name:<24} {label:<12} {cpu:>10.2f} {peak:>12.1f} {len(rows):>6}")
+
+
+def synthetic_dlny_payload(articles=20, filler=2000, now_ms=None):
+    """生成与 dlnyzb search.json 结构一致的页面状态：articles 前后各有大量无关的 Redux 状态，每 5 条早一小时"""
+    now_ms = now_ms or int(time.time() * 1000)
+    def block(prefix, n):
+        return [{"id": i, "name": f"{prefix}{i}", "summary": "电力能源行业招标采购信息汇总" * 4, "tags": ["电力", "能源", "采购"]} for i in range(n)]
+    state = {
+        "channels": {"data": block("频道", filler // 2)},
+        "searchArticlesList": {"loading": False, "data": {
+            "total": 5000,
+            "articles": [{
+                "articleId": 900000 + i,
+                "title": f"<em>培训</em>服务项目（第{i}包）采购公告(重新招标)",
+                "noticeTime": now_ms - i // 5 * 3600 * 1000,
+                "content": "公告摘要" * 50,
+                "region": "北京",
+            } for i in range(articles)],
+        }},
+        "recommend": {"data": block("推荐", filler // 2)},
+    }
+    return json.dumps({"pageProps": {"initialState": state}, "__N_SSP": True}, ensure_ascii=False).encode("utf-8")
+
+
+def dlny_rows_json(content, loads):
+    """原脚本的路径：整包解码后按路径取 articles"""
+    data = loads(content)
+    data_list = data['pageProps']['initialState']['searchArticlesList']['data']['articles']
+    return ((a['articleId'], a['title'], a['noticeTime']) for a in data_list)
+
+
+def take_recent(rows, start_ms):
+    kept = []
+    for row in rows:
+        if row[2] < start_ms:
+            break
+        kept.append(row)
+    return kept
+
+
+def bench_dlny(args):
+    if args.pages:
+        pages = load_recorded(args.pages, "dlny", "/search.json")
+    else:
+        pages = [(f"synthetic-{args.articles}", synthetic_dlny_payload(args.articles, args.filler))]
+    start_ms = int((time.time() - args.hours * 3600) * 1000)
+    parsers = [("json 整包", lambda c: take_recent(dlny_rows_json(c, json.loads), start_ms))]
+    orjson = bid_nextdata.get_orjson()
+    if orjson is not None:
+        parsers.append(("orjson 整包", lambda c: take_recent(dlny_rows_json(c, orjson.loads), start_ms)))
+    parsers.append(("只解码 articles", lambda c: take_recent(bid_nextdata.iter_dlny_articles(c), start_ms)))
+    print(f"{'页面':<24} {'解析器':<14} {'CPU ms/页':>10} {'峰值内存 KB':>12} {'条数':>6}")
+    for name, content in pages:
+        baseline = None
+        for label, parse in parsers:
+            cpu, peak, rows = profile_page(lambda: parse(content), args.repeat)
+            if baseline is None:
+                baseline = rows
+            elif rows != baseline:
+                print(f"  警告：{label} 的结果与整包解码不一致")
+            print(f"{name:<24} {label:<14} {cpu:>10.2f} {peak:>12.1f} {len(rows):>6}")
+
+
+def bench_record(args):
+    n = args.number
+    titles = [f"关于2025年第{i}批培训服务项目的采购公告" for i in range(n)]
+    urls = [f"http://www.tower.com.cn/#/noticeDetail?id={100000 + i}" for i in range(n)]
+    stamps = [f"2025-07-28 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}" for i in range(n)]
+
+    def per_item(build):
+        tracemalloc.start()
+        items = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del items
+        return size / n
+
+    # 字段字符串两种方式共用，只比较容器本身
+    dict_bytes = per_item(lambda: [{"标题": t, "类型": "采购公告", "链接": u} for t, u in zip(titles, urls)])
+    record_bytes = per_item(lambda: [Announcement(i, "zgtt", "采购公告", t, u, 1753660800) for i, (t, u) in enumerate(zip(titles, urls))])
+    print(f"{'dict（原结构）':<32} {dict_bytes:>12.0f} B/条")
+    print(f"{'Announcement':<32} {record_bytes:>12.0f} B/条")
+    stamp = iter(stamps * 1000)
+    report("datetime.strptime", *measure(lambda: datetime.strptime(next(stamp), "%Y-%m-%d %H:%M:%S"), n))
+    report("parse_ts", *measure(lambda: parse_ts(next(stamp)), n))
+    report("Announcement.make", *measure(lambda: Announcement.make("zgtt", titles[0], urls[0], 1753660800, "采购公告"), n))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WinBid 性能基准")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ua = sub.add_parser("ua", help="User-Agent 取用开销")
+    ua.add_argument("-n", "--number", type=int, default=100000)
+    ua.set_defaults(func=bench_ua)
+    ghcg = sub.add_parser("ghcg", help="国和采购搜索页解析：bs4 与增量解析对比")
+    ghcg.add_argument("--pages", help="bid_replay 录制目录（取 ghcg 的搜索页响应），不指定则使用合成页面")
+    ghcg.add_argument("--rows", type=int, default=200, help="合成页面的结果行数")
+    ghcg.add_argument("--days", type=int, default=1, help="保留最近几天的公告（1 表示当天）")
+    ghcg.add_argument("--repeat", type=int, default=20)
+    ghcg.set_defaults(func=bench_ghcg)
+    dlny = sub.add_parser("dlny", help="能力电源 search.json 解码：整包解码与只解码 articles 对比")
+    dlny.add_argument("--pages", help="bid_replay 录制目录（取 dlny 的 search.json 响应），不指定则使用合成数据")
+    dlny.add_argument("--articles", type=int, default=20, help="合成数据的公告条数")
+    dlny.add_argument("--filler", type=int, default=2000, help="合成数据中无关状态的条目数")
+    dlny.add_argument("--hours", type=float, default=24, help="保留最近几小时的公告")
+    dlny.add_argument("--repeat", type=int, default=20)
+    dlny.set_defaults(func=bench_dlny)
+    record = sub.add_parser("record", help="公告记录：dict 与 Announcement 的内存、时间解析开销")
+    record.add_argument("-n", "--number", type=int, default=10000)
+    record.set_defaults(func=bench_record)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
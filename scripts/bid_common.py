@@ -0,0 +1,470 @@
+import os
+import io
+import sys
+import gzip
+import json
+import time
+import queue
+import atexit
+import random
+import shutil
+import logging
+import logging.handlers
+import threading
+import requests
+from datetime import datetime, timezone, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from bid_metrics import RETRIES, HTTP_ERRORS, WEBHOOK_SECONDS, WEBHOOK_ERRCODES
+from bid_trace import span, current
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 统一以脚本目录为基准，避免 'scripts/bid.json' 与 './bid.json' 两套相对路径
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(BASE_DIR, "bid.json")
+LOG_DIR = os.path.join(BASE_DIR, "output")
+UA_FILE = os.path.join(BASE_DIR, "user_agents.txt")
+EGRESS_FILE = os.path.join(LOG_DIR, "egress_ip.json")
+# 出口 IP 探测结果的缓存时间（秒）
+EGRESS_TTL = 3600
+
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+# 日志文件超过这个大小或跨过零点时轮换，旧文件 gzip 压缩，保留 LOG_BACKUPS 个
+LOG_MAX_BYTES = 20 * 1024 * 1024
+LOG_BACKUPS = 10
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# HTTP 错误时记录的响应内容：最多 RESPONSE_LOG_BYTES 字节；同一 (站点, 状态码) 前 RESPONSE_LOG_FIRST 次都记录，
+# 之后每 RESPONSE_LOG_EVERY 次记录一次
+RESPONSE_LOG_BYTES = 512
+RESPONSE_LOG_FIRST = 3
+RESPONSE_LOG_EVERY = 50
+
+logger = logging.getLogger()
+
+# 配置重试策略
+retry_strategy = Retry(
+    total=3,                              # 总尝试次数（含首次请求）
+    backoff_factor=1,                     # 指数退避间隔：{backoff_factor} * 2^(n-1)秒
+    status_forcelist=[500, 502, 503, 504],# 遇到这些状态码自动重试
+    allowed_methods=["GET", "POST"]       # 仅对指定HTTP方法重试
+)
+
+# 视为登录态/预热失效的状态码，遇到后重新预热一次再重试
+AUTH_STATUS = (401, 403, 419)
+# 主页预热的有效期（秒），到期或 cookie 过期后才重新预热
+WARM_MAX_AGE = 30 * 60
+# 无需预热的站点，同一个 User-Agent 保持多久（秒）
+UA_STICKY = 30 * 60
+
+
+# 录制 / 回放时替换传输层（见 bid_replay）：factory(name) 返回挂到会话上的 requests adapter
+_transport = None
+
+
+def set_transport(factory):
+    """之后创建的 SiteSession / WeComWebhook 都挂上 factory(name) 返回的 adapter；传 None 恢复默认"""
+    global _transport
+    _transport = factory
+
+
+def load_config(path=CONFIG_FILE):
+    """读取 bid.json，返回 (keyword_list, not_list, bid)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        bid = json.load(f)
+    keyword_main = bid["keyword"]["main"]
+    keyword_others = bid["keyword"]["others"]
+    keyword_list = keyword_main + keyword_others
+    not_list = bid["keyword"]["not"]
+    return keyword_list, not_list, bid
+
+
+def get_key(name, bid=None):
+    """优先读取环境变量，其次读取 bid.json 中的 key 段（winbid.py 的用法）"""
+    value = os.getenv(name)
+    if not value and bid is not None:
+        value = bid.get("key", {}).get(name)
+    return value
+
+
+class CompressingRotatingHandler(logging.handlers.RotatingFileHandler):
+    """按大小和自然日轮换，轮换出的旧文件压缩为 .N.gz"""
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True)
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self.compress
+        self.rollover_at = self.next_midnight()
+
+    @staticmethod
+    def next_midnight():
+        tomorrow = datetime.now(BEIJING_TZ).date() + timedelta(days=1)
+        return datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=BEIJING_TZ).timestamp()
+
+    @staticmethod
+    def compress(source, dest):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at and os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self.next_midnight()
+
+
+class SiteRouter(logging.Handler):
+    """在后台写线程里按记录的站点分文件：带站点的写 bid_log_<name>_<site>.log，其余写 bid_log_<name>.log"""
+    def __init__(self, name, split_sites=True):
+        super().__init__()
+        self.log_name = name
+        self.split_sites = split_sites
+        self.formatter = logging.Formatter(LOG_FORMAT)
+        self.handlers = {}
+
+    def handler(self, site):
+        handler = self.handlers.get(site)
+        if handler is None:
+            name = f"{self.log_name}_{site}" if site else self.log_name
+            handler = self.handlers[site] = CompressingRotatingHandler(log_path(name))
+            handler.setFormatter(self.formatter)
+        return handler
+
+    def emit(self, record):
+        site = getattr(record, "site", None) if self.split_sites else None
+        self.handler(site).handle(record)
+
+    def close(self):
+        for handler in self.handlers.values():
+            handler.close()
+        super().close()
+
+
+class ContextFilter(logging.Filter):
+    """在调用线程里给记录带上当前上下文的站点（写线程里已拿不到 contextvars）"""
+    def filter(self, record):
+        record.site = current().get("site")
+        return True
+
+
+def log_path(name):
+    """bid_log_<name>.log；若已被另一个进程占用（同名脚本跑了两份），改用带 pid 的文件名，避免两个进程写坏同一个文件"""
+    path = os.path.join(LOG_DIR, f"bid_log_{name}.log")
+    if fcntl is None:
+        return path
+    lock = open(path + ".lock", 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return os.path.join(LOG_DIR, f"bid_log_{name}.{os.getpid()}.log")
+    # 锁随进程存活，文件对象保持打开
+    _log_locks.append(lock)
+    return path
+
+
+_log_locks = []
+_listener = None
+
+
+def setup_logging(name, split_sites=True):
+    """配置根日志：logger 调用只把记录放进队列，由后台线程写文件（按站点分文件、轮换压缩）和控制台，
+    抓取路径上没有磁盘 I/O。每个进程写自己的日志文件"""
+    global _listener
+    if isinstance(sys.stdout, io.TextIOWrapper) and sys.stdout.encoding.lower() != 'utf-8':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    # 确保日志目录存在
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+
+    logger.setLevel(logging.INFO)
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+
+    # 保留控制台输出
+    console_handler = logging.StreamHandler()
+    _listener = logging.handlers.QueueListener(records, SiteRouter(name, split_sites), console_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return logger
+
+
+_response_counts = {}
+_response_lock = threading.Lock()
+
+
+def response_excerpt(site, response, limit=RESPONSE_LOG_BYTES):
+    """HTTP 错误日志里的响应内容：截断到 limit 字节，同一 (站点, 状态码) 按 RESPONSE_LOG_FIRST / RESPONSE_LOG_EVERY 抽样"""
+    key = (site, response.status_code)
+    with _response_lock:
+        count = _response_counts[key] = _response_counts.get(key, 0) + 1
+    if count > RESPONSE_LOG_FIRST and count % RESPONSE_LOG_EVERY:
+        return f"（已省略，第 {count} 次）"
+    content = response.content
+    text = content[:limit].decode(response.encoding or 'utf-8', errors='ignore')
+    if len(content) > limit:
+        text += f"…（共 {len(content)} 字节）"
+    return text
+
+
+def beijing_now():
+    return datetime.now(BEIJING_TZ)
+
+
+def probe_egress_ip(ttl=EGRESS_TTL):
+    """查询当前出口（代理）IP，结果缓存到文件，缓存有效期内不再联网"""
+    try:
+        with open(EGRESS_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if time.time() - cached["checked_at"] < ttl:
+            logger.info(f"当前代理IP: {cached['ip']}（缓存）")
+            return cached["ip"]
+    except Exception:
+        pass
+    try:
+        response = requests.get("https://api.ipify.org", timeout=10)
+        ip = response.text
+        logger.info(f"当前代理IP: {ip}")
+    except Exception as e:
+        logger.info(f"代理请求失败: {e}")
+        return None
+    os.makedirs(LOG_DIR, exist_ok=True)
+    with open(EGRESS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"ip": ip, "checked_at": time.time()}, f)
+    return ip
+
+
+class UserAgentPool:
+    """启动时一次性读入内置 User-Agent 列表（离线可用），之后按顺序轮换，每次取用只是一次取模下标"""
+    def __init__(self, path=UA_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            self.agents = tuple(line.strip() for line in f if line.strip() and not line.startswith('#'))
+        self.index = random.randrange(len(self.agents))
+        self.lock = threading.Lock()
+
+    def next(self):
+        with self.lock:
+            self.index = (self.index + 1) % len(self.agents)
+            return self.agents[self.index]
+
+
+_ua_pool = None
+_ua_lock = threading.Lock()
+
+
+def get_user_agent_pool():
+    global _ua_pool
+    if _ua_pool is None:
+        with _ua_lock:
+            if _ua_pool is None:
+                _ua_pool = UserAgentPool()
+    return _ua_pool
+
+
+class SiteSession:
+    """站点级长连接：进程内复用同一个 Session，连接池同时挂在 http:// 和 https://，
+    主页预热只在首次、cookie 过期或接口返回登录失效时执行。
+    User-Agent 与 cookie 绑定：每次预热时换一个，预热之间保持不变；无需预热的站点每 ua_sticky 秒换一个"""
+    def __init__(self, home_url=None, home_method="GET", pool_size=16, max_age=WARM_MAX_AGE, ua_sticky=UA_STICKY, name=None):
+        self.name = name
+        self.home_url = home_url
+        self.home_method = home_method
+        self.max_age = max_age
+        self.ua_sticky = ua_sticky
+        self.ua_until = 0
+        self.session = requests.Session()
+        if _transport is not None:
+            adapter = _transport(name)
+        else:
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry_strategy)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.lock = threading.Lock()
+        self.warmed_at = None
+        self.rotate_user_agent()
+
+    @property
+    def user_agent(self):
+        return self.session.headers['User-Agent']
+
+    def rotate_user_agent(self):
+        self.session.headers['User-Agent'] = get_user_agent_pool().next()
+        self.ua_until = time.monotonic() + self.ua_sticky
+
+    def cookies_expired(self):
+        now = time.time()
+        return any(cookie.is_expired(now) for cookie in self.session.cookies)
+
+    def need_warm_up(self):
+        if self.home_url is None:
+            return False
+        if self.warmed_at is None:
+            return True
+        return time.monotonic() - self.warmed_at > self.max_age or self.cookies_expired()
+
+    def warm_up(self, force=False):
+        if not force and not self.need_warm_up():
+            return
+        with self.lock:
+            if not force and not self.need_warm_up():
+                return
+            self.rotate_user_agent()
+            with span("home") as home_span:
+                home_response = self.session.request(self.home_method, self.home_url, timeout=60)
+                home_span["bytes"] = len(home_response.content)
+                home_span["status"] = home_response.status_code
+            home_response.raise_for_status()
+            self.warmed_at = time.monotonic()
+
+    def invalidate(self):
+        """接口返回登录失效时调用，下次请求前重新预热"""
+        self.warmed_at = None
+
+    def request(self, method, url, **kwargs):
+        self.warm_up()
+        if self.home_url is None and time.monotonic() > self.ua_until:
+            self.rotate_user_agent()
+        response = self.send(method, url, **kwargs)
+        if response.status_code in AUTH_STATUS and self.home_url is not None:
+            logger.info(f"{url} 返回 {response.status_code}，重新预热后重试")
+            RETRIES.inc(site=self.name, reason="auth")
+            self.session.cookies.clear()
+            self.warm_up(force=True)
+            response = self.send(method, url, **kwargs)
+        return response
+
+    def send(self, method, url, **kwargs):
+        """发出请求并记录 urllib3 内部重试次数、错误状态码和请求异常"""
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            HTTP_ERRORS.inc(site=self.name, status=type(e).__name__)
+            raise
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None and retries.history:
+            RETRIES.inc(len(retries.history), site=self.name, reason="status")
+        if response.status_code >= 400:
+            HTTP_ERRORS.inc(site=self.name, status=response.status_code)
+        return response
+
+    def export_state(self):
+        """导出 cookie、User-Agent 和预热时间，供轮换后的新进程接着用"""
+        now = time.monotonic()
+        return {
+            "cookies": [
+                {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expires": c.expires, "secure": c.secure}
+                for c in self.session.cookies
+            ],
+            "user_agent": self.user_agent,
+            "ua_left": self.ua_until - now,
+            "warmed_ago": None if self.warmed_at is None else now - self.warmed_at,
+            "exported_at": time.time(),
+        }
+
+    def restore_state(self, state):
+        elapsed = time.time() - state["exported_at"]
+        now = time.monotonic()
+        for c in state["cookies"]:
+            self.session.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"], expires=c["expires"], secure=c["secure"])
+        self.session.headers['User-Agent'] = state["user_agent"]
+        self.ua_until = now + state["ua_left"] - elapsed
+        if state["warmed_ago"] is not None:
+            self.warmed_at = now - state["warmed_ago"] - elapsed
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+# 上一个进程交接过来、尚未创建的站点会话状态
+_handoff = {}
+
+
+def get_session(name, home_url=None, home_method="GET", pool_size=16):
+    """按站点名取得进程级共享的 SiteSession"""
+    session = _sessions.get(name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = SiteSession(home_url, home_method, pool_size, name=name)
+                state = _handoff.pop(name, None)
+                if state is not None:
+                    session.restore_state(state)
+                _sessions[name] = session
+    return session
+
+
+def save_handoff(path):
+    """进程退出前把所有站点会话写到交接文件"""
+    with _sessions_lock:
+        state = {name: session.export_state() for name, session in _sessions.items()}
+    state.update(_handoff)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def load_handoff(path):
+    """读取并删除交接文件，会话在首次 get_session 时恢复"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return
+    os.remove(path)
+    _handoff.update(state)
+    logger.info(f"接管上一进程的会话: {list(state)}")
+
+
+class WeComWebhook:
+    BASE_URL = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key={key}"
+    def __init__(self, webhook_key, name="WECOM_WEBHOOK_KEY"):
+        self.webhook_key = webhook_key
+        if not self.webhook_key:
+            logger.error(f"未检测到环境变量 {name}")
+            raise ValueError("缺失密钥")
+        self.name = name
+        # 复用连接，避免每条消息重新握手
+        self.session = requests.Session()
+        if _transport is not None:
+            self.session.mount("https://", _transport(name))
+
+    def send_text(self, content: str) -> dict:
+        payload = {"msgtype": "text", "text": {"content": content}}
+        try:
+            with WEBHOOK_SECONDS.time(bot=self.name), span("send", bot=self.name, bytes=len(content.encode("utf-8"))):
+                response = self.session.post(
+                    self.BASE_URL.format(key=self.webhook_key),
+                    json=payload,
+                    timeout=60
+                )
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            logger.error(f"消息发送失败: {str(e)}")
+            result = {"errcode": -1, "errmsg": "请求异常"}
+        WEBHOOK_ERRCODES.inc(bot=self.name, errcode=result.get("errcode"))
+        return result
@@ -0,0 +1,437 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+import argparse
+import subprocess
+from contextlib import contextmanager
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from bid_common import BASE_DIR, LOG_DIR, load_config, get_key, setup_logging, beijing_now, probe_egress_ip, save_handoff, load_handoff, WeComWebhook
+from bid_sites import SITES, forget_responses, commit_cursors, discard_cursors
+from bid_plan import plan_queries
+from bid_match import KeywordMatcher
+from bid_store import STORE_FILE, SeenStore, SeenFilter, set_cursor_store
+from bid_schedule import PollScheduler, MIN_INTERVAL, MAX_INTERVAL
+from bid_notify import WeComSender, Digest
+from bid_metrics import REGISTRY, SNAPSHOT_INTERVAL, ITEMS, DEDUP_HITS, CYCLE_SECONDS, SEARCH_SECONDS, start_http_server
+from bid_trace import TRACER, span, emit, bind, carry
+
+logger = logging.getLogger()
+
+DEFAULT_HOURS = 5.95
+
+
+class HostLimiter:
+    """按主机限制同时在途的请求数，并保证两次请求之间的最小间隔"""
+    def __init__(self, concurrency, delay=0):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self.lock = asyncio.Lock()
+        self.next_time = 0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.delay:
+            async with self.lock:
+                wait = self.next_time - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    emit("throttle", wait)
+                self.next_time = time.monotonic() + self.delay
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+
+
+class Engine:
+    """单进程 asyncio 引擎：所有站点并行轮询，阻塞的 requests 调用放到线程池里执行"""
+    def __init__(self, site_names, hours=DEFAULT_HOURS, once=False, handoff=None, metrics_port=None, metrics_file=None, trace_file=None,
+                 store=None, scheduler=None, keyword_list=None, not_list=None, key_env=None, lookback=None,
+                 notify=True, test_key="key_test"):
+        self.init_times = []
+        # 交接文件：启动时接管上一进程的会话，退出时写出给下一进程
+        self.handoff = handoff
+        # 指标：metrics_port 提供 Prometheus 端点，metrics_file 定期写 JSON 快照
+        self.metrics_port = metrics_port
+        self.metrics_file = metrics_file
+        # 各阶段耗时的追踪事件（JSON lines）
+        self.trace_file = trace_file
+        with self.timed("load_config"):
+            self.keyword_list, self.not_list, self.bid = load_config()
+        # 旧入口脚本各自的关键词、排除词、推送机器人和回看窗口，覆盖 bid.json 与站点表里的默认值
+        if keyword_list is not None:
+            self.keyword_list = keyword_list
+        if not_list is not None:
+            self.not_list = not_list
+        overrides = {"key_env": key_env, "lookback": lookback}
+        overrides = {field: value for field, value in overrides.items() if value is not None}
+        self.sites = {name: {**SITES[name], **overrides} for name in site_names}
+        # notify=False 时命中只写日志，不推送
+        self.notify = notify
+        self.site_names = site_names
+        self.hours = hours
+        self.once = once
+        self.limiters = {}
+        self.webhooks = {}
+        self.digests = {}
+        with self.timed("limiters/executor"):
+            workers = 4
+            for name in site_names:
+                site = SITES[name]
+                host = site["host"]
+                if host not in self.limiters:
+                    self.limiters[host] = HostLimiter(site["concurrency"], site["delay"])
+                    workers += site["concurrency"]
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bid")
+        with self.timed("webhook"):
+            self.webhook_test = self.get_webhook(test_key, required=False) if test_key else None
+        # 去重库与发布速率默认用 output/ 下的文件；回放基准传入临时目录里的实例
+        with self.timed("SeenStore"):
+            self.store = SeenStore() if store is None else store
+        with self.timed("PollScheduler"):
+            self.scheduler = PollScheduler() if scheduler is None else scheduler
+        logger.info("启动耗时: " + ", ".join(f"{stage} {ms:.1f}ms" for stage, ms in self.init_times))
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        yield
+        self.init_times.append((stage, (time.perf_counter() - start) * 1000))
+
+    def get_webhook(self, key_env, required=True):
+        """每个机器人密钥一个后台投递队列"""
+        if key_env not in self.webhooks:
+            try:
+                webhook = WeComWebhook(get_key(key_env, self.bid), key_env)
+                self.webhooks[key_env] = WeComSender(webhook, self.call)
+            except ValueError:
+                if required:
+                    raise
+                self.webhooks[key_env] = None
+        return self.webhooks[key_env]
+
+    def get_digest(self, key_env):
+        """同一个机器人的站点共用一个汇总"""
+        if key_env not in self.digests:
+            self.digests[key_env] = Digest(self.get_webhook(key_env))
+        return self.digests[key_env]
+
+    async def call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, carry(func), *args)
+
+    async def notify_test(self, content):
+        logger.info(content)
+        if self.webhook_test is not None:
+            await self.webhook_test.send(content)
+
+    async def search(self, name, site, keyword, start_time):
+        # gather 为每个查询建立独立任务，这里绑定的 keyword 只影响本查询
+        bind(keyword=keyword)
+        async with self.limiters[site["host"]]:
+            with SEARCH_SECONDS.time(site=name, query=keyword), span("search"):
+                result = await self.call(site["search"], keyword, start_time)
+        return result or []
+
+    def match(self, name, matcher, queries, results):
+        """合并各查询的结果，在本地标注命中的关键词；合成查询（空标题扫描）的结果必须命中某个关键词。
+        返回 [(bid, keywords, excluded)]"""
+        keywords = set(self.keyword_list)
+        candidates = []
+        ids = set()
+        for query, result in zip(queries, results):
+            for bid in result:
+                if bid.id in ids:
+                    continue
+                hits, excluded = matcher.scan(bid.title)
+                if not hits:
+                    if query not in keywords:
+                        continue
+                    hits = [query]
+                ids.add(bid.id)
+                candidates.append((bid, hits, excluded))
+        return candidates
+
+    def filter_window(self, site):
+        """内存过滤器的时间窗口（秒）：回看窗口的两倍，按天过滤的站点取两天"""
+        if site["lookback"] == "day":
+            return 2 * 24 * 3600
+        return 2 * site["lookback"].total_seconds()
+
+    def interval_bounds(self, site):
+        """轮询间隔上下限；按时间窗口回看的站点，间隔不能超过窗口的一半，否则会漏掉公告"""
+        min_interval = site.get("min_interval", MIN_INTERVAL)
+        max_interval = site.get("max_interval", MAX_INTERVAL)
+        if site["lookback"] != "day":
+            max_interval = min(max_interval, site["lookback"].total_seconds() / 2)
+        return min_interval, max(min_interval, max_interval)
+
+    def lookback_seconds(self, site):
+        """回看窗口（秒）；按天过滤的站点取一天。两轮开始的间隔或单轮耗时超过它就可能漏公告"""
+        if site["lookback"] == "day":
+            return 24 * 3600
+        return site["lookback"].total_seconds()
+
+    def start_time(self, site, beijing_time):
+        if site["lookback"] == "day":
+            return beijing_time.date()
+        return beijing_time - site["lookback"]
+
+    async def run_site(self, name, end_time):
+        # 每个站点是 gather 里的独立任务，绑定的 site 用于追踪和按站点分日志
+        bind(site=name)
+        site = self.sites[name]
+        com_key = site["com_key"]
+        try:
+            digest = self.get_digest(site["key_env"]) if self.notify else None
+        except ValueError:
+            logger.error(f"{com_key}，缺失推送密钥 {site['key_env']}，跳过该站点")
+            return
+        matcher = KeywordMatcher(self.keyword_list, self.not_list + site.get("not_extra", []))
+        min_interval, max_interval = self.interval_bounds(site)
+        queries = plan_queries(self.keyword_list, site.get("plan", "collapse"))
+        logger.info(f"{com_key}，查询计划: {len(self.keyword_list)} 个关键词 -> {len(queries)} 次查询 {queries}")
+
+        # 内存过滤器挡住绝大多数重复项，只有未命中的才查 SQLite
+        seen_filter = SeenFilter(self.filter_window(site))
+        # 发布速率按查询返回的、窗口内首次出现的公告计数，不论是否命中关键词或被排除
+        published = SeenFilter(self.filter_window(site))
+        last_start = None
+        lookback = self.lookback_seconds(site)
+        cycle_no = 0
+        beijing_time = beijing_now()
+        while beijing_time <= end_time:
+            cycle_start = time.monotonic()
+            cycle_no += 1
+            bind(cycle=f"{name}-{os.getpid()}-{cycle_no}", site=name)
+            candidates, new_items = [], []
+            try:
+                start_time = self.start_time(site, beijing_time)
+                logger.info(f"{com_key}，start_time: {start_time}")
+                results = await asyncio.gather(*[
+                    self.search(name, site, query, start_time) for query in queries
+                ])
+                counts = {}
+                for result in results:
+                    for bid in result:
+                        if bid.id not in published:
+                            published.add(bid.id)
+                            counts[bid.type] = counts.get(bid.type, 0) + 1
+                with span("match"):
+                    candidates = self.match(name, matcher, queries, results)
+                with span("dedup"):
+                    unfiltered = [bid.id for bid, hits, excluded in candidates if bid.id not in seen_filter]
+                    seen = await self.call(self.store.seen, unfiltered)
+                DEDUP_HITS.inc(len(candidates) - len(unfiltered), site=name, layer="filter")
+                DEDUP_HITS.inc(len(seen), site=name, layer="store")
+                for bid_id in seen:
+                    seen_filter.add(bid_id)
+                for bid, hits, excluded in candidates:
+                    ITEMS.inc(site=name, type=bid.type, stage="matched")
+                    if bid.id in seen or bid.id in seen_filter:
+                        continue
+                    ITEMS.inc(site=name, type=bid.type, stage="new")
+                    logger.info(f"{com_key}，keyword：{'、'.join(hits)}，msg['标题']：{bid.title}")
+                    if excluded:
+                        # 被排除的公告不入库，记进内存过滤器，下一轮不再算作新公告
+                        seen_filter.add(bid.id)
+                        continue
+                    new_items.append((bid.id, name, bid.title))
+                    if digest is None:
+                        continue
+                    ITEMS.inc(site=name, type=bid.type, stage="notified")
+                    await digest.add(com_key, bid, hits)
+
+                # SQLite 写入（WAL fsync）和游标提交放到线程池，不阻塞其他站点的轮次
+                await self.call(self.store.add_many, new_items)
+                for bid_id, _, _ in new_items:
+                    seen_filter.add(bid_id)
+                await self.call(commit_cursors, name)
+                await self.call(self.store.expire)
+                if last_start is not None:
+                    self.scheduler.record(name, counts, cycle_start - last_start, beijing_time)
+                    self.scheduler.save()
+
+            except Exception as e:
+                # 本轮的公告可能没有入库，下一轮不能因为响应未变而跳过，也不能从推进过的游标开始读
+                forget_responses(name)
+                discard_cursors(name)
+                logger.error(f"{com_key}，全局异常: {str(e)}")
+                await self.notify_test(f"{com_key}，全局异常: {str(e)}")
+
+            duration = time.monotonic() - cycle_start
+            since_last = None if last_start is None else cycle_start - last_start
+            exceeded = duration > lookback or (since_last is not None and since_last > lookback)
+            CYCLE_SECONDS.observe(duration, site=name)
+            emit("cycle", duration, lookback=lookback, since_last=since_last, exceeded=exceeded,
+                 items=len(candidates), notified=len(new_items))
+            if exceeded:
+                logger.error(f"{com_key}，本轮耗时 {duration:.0f} 秒、距上轮 {since_last or 0:.0f} 秒，超过回看窗口 {lookback:.0f} 秒，可能漏公告")
+
+            if self.once:
+                break
+            last_start = cycle_start
+            interval = self.scheduler.next_interval(name, beijing_time, min_interval, max_interval)
+            wait = interval - (time.monotonic() - cycle_start)
+            # 不睡过本进程的运行时段，监督进程才能按时轮换
+            wait = min(wait, max(0, (end_time - beijing_now()).total_seconds()))
+            logger.info(f"{com_key}，下次轮询间隔: {interval:.0f} 秒")
+            if wait > 0:
+                await asyncio.sleep(wait)
+                emit("sleep", wait)
+            beijing_time = beijing_now()
+
+    async def write_metrics(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            await self.call(REGISTRY.write_snapshot, self.metrics_file)
+
+    async def run(self):
+        # SIGTERM（监督进程轮换或停止）时取消主任务，走下面的 finally 正常收尾
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+        if self.handoff is not None:
+            load_handoff(self.handoff)
+        if self.trace_file is not None:
+            TRACER.open(self.trace_file)
+        beijing_time = beijing_now()
+        end_time = beijing_time + timedelta(hours=self.hours)
+        names = "、".join(SITES[name]["com_key"] for name in self.site_names)
+        logger.info(f"end_time: {end_time}")
+        await self.notify_test(f"重启，必胜！{names}, {beijing_time}")
+        # 出口 IP 探测不阻塞启动，放到后台执行
+        egress = asyncio.create_task(self.call(probe_egress_ip))
+        server = start_http_server(self.metrics_port) if self.metrics_port else None
+        snapshots = asyncio.create_task(self.write_metrics()) if self.metrics_file else None
+        try:
+            await asyncio.gather(*[self.run_site(name, end_time) for name in self.site_names])
+        finally:
+            now_time = beijing_now().strftime("%Y-%m-%d %H:%M:%S")
+            egress.cancel()
+            for digest in self.digests.values():
+                await digest.close()
+            await self.notify_test(f"归零，更新！{names}, {now_time}")
+            for sender in self.webhooks.values():
+                if sender is not None:
+                    await sender.close()
+            if self.handoff is not None:
+                save_handoff(self.handoff)
+            if snapshots is not None:
+                snapshots.cancel()
+                REGISTRY.write_snapshot(self.metrics_file)
+            if server is not None:
+                server.shutdown()
+            TRACER.close()
+            self.executor.shutdown(wait=False)
+            self.store.close()
+
+
+def run(site_names=None, hours=DEFAULT_HOURS, once=False, log_name="engine", handoff=None, metrics_port=None, standin=None,
+        trace=False, **overrides):
+    """overrides 透传给 Engine：keyword_list、not_list、key_env、lookback、notify、test_key"""
+    # 多站点进程按站点分日志文件；单站点工作进程的日志本就只属于一个站点
+    setup_logging(log_name, split_sites=site_names is None or len(site_names) > 1)
+    # 压测：站点请求和 webhook 发往本机替身服务器（bid_standin），监督进程的工作进程通过环境变量继承
+    standin = standin or os.getenv("BID_STANDIN")
+    if standin:
+        from bid_standin import use_standin
+        use_standin(standin)
+        logger.info(f"使用替身服务器: {standin}")
+    if not site_names:
+        site_names = [name for name, site in SITES.items() if site["enabled"]]
+    logger.info(f"【调试】引擎启动，站点: {site_names}")
+    metrics_file = os.path.join(LOG_DIR, f"bid_metrics_{log_name}.json")
+    # 追踪默认关闭，排查性能时用 --trace 或环境变量 BID_TRACE=1 打开（监督进程的工作进程通过环境变量继承）
+    trace_file = None
+    if trace or os.getenv("BID_TRACE"):
+        trace_file = os.path.join(LOG_DIR, f"bid_trace_{log_name}.jsonl")
+    # 覆盖了关键词或推送目标的入口用自己的去重库和游标，否则它记下的公告会让别的机器人漏推。
+    # 库名按入口名、推送机器人区分，只写日志的入口再单独一个库，不会与推送的入口共用
+    store = None
+    if overrides:
+        entry = f"{log_name}_{overrides.get('key_env') or 'default'}"
+        if not overrides.get("notify", True):
+            entry += "_log"
+        path = os.path.join(os.path.dirname(STORE_FILE), f"bid_seen_{entry}.db")
+        store = SeenStore(path)
+        set_cursor_store(path)
+    engine = Engine(site_names, hours=hours, once=once, handoff=handoff,
+                    metrics_port=metrics_port, metrics_file=metrics_file, trace_file=trace_file, store=store, **overrides)
+    try:
+        asyncio.run(engine.run())
+    except asyncio.CancelledError:
+        logger.info(f"收到停止信号，已退出: {site_names}")
+
+
+def import_profile(depth=2, min_ms=1.0):
+    """在子进程里用 -X importtime 导入引擎，返回 bid_engine 之下 depth 层内、累计耗时不少于 min_ms 的模块
+    [(层级, 模块, 毫秒)]"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bid_engine"],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # -X importtime 每深一层多缩进两个空格，且子模块先于父模块输出
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        ms = int(cumulative) / 1000
+        if level <= depth and ms >= min_ms:
+            rows.append((level, name.strip(), ms))
+    # 倒序后父模块排在其子模块之前
+    return rows[::-1]
+
+
+def startup_profile(site_names):
+    """打印导入耗时与初始化各阶段耗时"""
+    print("导入耗时（累计，毫秒）:")
+    for level, name, ms in import_profile():
+        print(f"  {'  ' * level + name:<32} {ms:>9.1f}")
+    if not site_names:
+        site_names = [name for name, site in SITES.items() if site["enabled"]]
+    start = time.perf_counter()
+    engine = Engine(site_names)
+    total = (time.perf_counter() - start) * 1000
+    print("初始化耗时（毫秒）:")
+    for stage, ms in engine.init_times:
+        print(f"  {stage:<32} {ms:>9.1f}")
+    print(f"  {'合计':<32} {total:>9.1f}")
+    engine.executor.shutdown(wait=False)
+    engine.store.close()
+
+
+def lambda_handler(event, context):
+    """Lambda入口函数"""
+    run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WinBid 单进程招标监控引擎")
+    parser.add_argument("sites", nargs="*", help=f"站点列表，可选 {'/'.join(SITES)}，默认全部启用的站点")
+    parser.add_argument("--hours", type=float, default=DEFAULT_HOURS, help="运行时长（小时）")
+    parser.add_argument("--once", action="store_true", help="只跑一轮")
+    parser.add_argument("--startup-profile", action="store_true", help="只统计导入和初始化耗时，不抓取")
+    parser.add_argument("--metrics-port", type=int, default=None, help="在本机该端口提供 Prometheus 指标 /metrics")
+    parser.add_argument("--trace", action="store_true", help="写各阶段耗时追踪到 output/bid_trace_<名称>.jsonl，也可用环境变量 BID_TRACE=1")
+    parser.add_argument("--standin", default=None, help="替身服务器地址（压测用，见 bid_standin），也可用环境变量 BID_STANDIN")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.sites if name not in SITES]
+    if unknown:
+        parser.error(f"未知站点: {unknown}")
+    if args.startup_profile:
+        startup_profile(args.sites)
+        return
+    run(args.sites, hours=args.hours, once=args.once, metrics_port=args.metrics_port, standin=args.standin, trace=args.trace)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
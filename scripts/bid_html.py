@@ -0,0 +1,147 @@
+import io
+from html.parser import HTMLParser
+
+# 国和采购搜索结果所在的容器，只解析从这里开始的片段
+GHCG_CONTAINER = "g_ryzs"
+GHCG_LIST = "g_bule"
+# 标准库解析器每次喂入的字符数
+FEED_SIZE = 16 * 1024
+# lxml 在第一次解析时才导入，不拖慢启动；None 表示还没导入过，False 表示未安装
+_etree = None
+
+
+def get_etree():
+    """返回 lxml.etree，未安装返回 None"""
+    global _etree
+    if _etree is None:
+        try:
+            from lxml import etree
+        except ImportError:
+            etree = False
+        _etree = etree
+    return _etree or None
+
+
+def has_class(value, name):
+    return name in (value or "").split()
+
+
+def container_fragment(html, marker=GHCG_CONTAINER):
+    """截取从结果容器开始标签起的片段，跳过页头、导航等无关部分"""
+    pos = html.find(marker)
+    if pos < 0:
+        return ""
+    return html[html.rfind("<", 0, pos):]
+
+
+def iter_ghcg_rows(html):
+    """逐行产出 div.g_ryzs ul.g_bule li 中的 (标题, 发布日期或 None, 链接)。
+    是生成器：调用方读到过期行后停止迭代，剩余部分不再解析。有 lxml 时用 lxml 增量解析，否则用标准库"""
+    fragment = container_fragment(html)
+    if not fragment:
+        return iter(())
+    if get_etree() is not None:
+        return _iter_rows_lxml(fragment)
+    return _iter_rows_stdlib(fragment)
+
+
+def _in_result_list(li):
+    in_list = False
+    for parent in li.iterancestors():
+        if parent.tag == "ul" and has_class(parent.get("class"), GHCG_LIST):
+            in_list = True
+        elif in_list and parent.tag == "div" and has_class(parent.get("class"), GHCG_CONTAINER):
+            return True
+    return False
+
+
+def _iter_rows_lxml(fragment):
+    source = io.BytesIO(fragment.encode("utf-8"))
+    for _, li in get_etree().iterparse(source, events=("end",), tag="li", html=True, encoding="utf-8"):
+        if _in_result_list(li):
+            a_tag = next(li.iter("a"), None)
+            if a_tag is not None:
+                title = "".join(a_tag.itertext()).strip()
+                date_span = next((span for span in li.iter("span") if has_class(span.get("class"), "fr")), None)
+                published = "".join(s.strip() for s in date_span.itertext()) if date_span is not None else None
+                yield title, published, a_tag.get("href")
+        # 已处理的行立即释放，内存不随页面长度增长
+        li.clear()
+        while li.getprevious() is not None:
+            del li.getparent()[0]
+
+
+class _GhcgRowParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.div_depth = 0      # 进入容器后的 div 嵌套层数，0 表示不在容器内
+        self.ul_depth = 0       # 进入结果列表后的 ul 嵌套层数
+        self.row = None
+        self.in_a = False
+        self.in_span = False
+
+    def start_row(self):
+        self.finish_row()
+        self.row = {"title": [], "published": None, "href": None, "has_a": False}
+
+    def finish_row(self):
+        row = self.row
+        if row is not None and row["has_a"]:
+            published = "".join(row["published"]) if row["published"] is not None else None
+            self.rows.append(("".join(row["title"]).strip(), published, row["href"]))
+        self.row = None
+        self.in_a = self.in_span = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "div":
+            if self.div_depth:
+                self.div_depth += 1
+            elif has_class(attrs.get("class"), GHCG_CONTAINER):
+                self.div_depth = 1
+        elif tag == "ul" and self.div_depth:
+            if self.ul_depth:
+                self.ul_depth += 1
+            elif has_class(attrs.get("class"), GHCG_LIST):
+                self.ul_depth = 1
+        elif tag == "li" and self.ul_depth:
+            self.start_row()
+        elif self.row is not None:
+            if tag == "a" and not self.row["has_a"]:
+                self.row["has_a"] = True
+                self.row["href"] = attrs.get("href")
+                self.in_a = True
+            elif tag == "span" and self.row["published"] is None and has_class(attrs.get("class"), "fr"):
+                self.row["published"] = []
+                self.in_span = True
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self.in_a = False
+        elif tag == "span":
+            self.in_span = False
+        elif tag == "li":
+            self.finish_row()
+        elif tag == "ul" and self.ul_depth:
+            self.finish_row()
+            self.ul_depth -= 1
+        elif tag == "div" and self.div_depth:
+            self.div_depth -= 1
+
+    def handle_data(self, data):
+        if self.in_a:
+            self.row["title"].append(data)
+        if self.in_span:
+            self.row["published"].append(data.strip())
+
+
+def _iter_rows_stdlib(fragment):
+    parser = _GhcgRowParser()
+    for i in range(0, len(fragment), FEED_SIZE):
+        parser.feed(fragment[i:i + FEED_SIZE])
+        yield from parser.rows
+        parser.rows.clear()
+    parser.close()
+    parser.finish_row()
+    yield from parser.rows
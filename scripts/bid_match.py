@@ -0,0 +1,60 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """Aho–Corasick 多模式匹配：由关键词和排除词编译成一个自动机，
+    一次扫描标题即可得到命中的关键词和是否命中排除词，耗时与关键词数量无关"""
+    def __init__(self, include, exclude=()):
+        self.include = list(dict.fromkeys(include))
+        self.exclude = list(dict.fromkeys(exclude))
+        patterns = self.include + self.exclude
+        self.n_include = len(self.include)
+
+        goto = [{}]
+        output = [set()]
+        for pid, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    output.append(set())
+                state = nxt
+            output[state].add(pid)
+
+        # 广度优先建立失败指针，并把失败链上的输出合并到当前节点
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                output[nxt] |= output[fail[nxt]]
+
+        self.goto = goto
+        self.fail = fail
+        self.output = [tuple(sorted(o)) for o in output]
+
+    def scan(self, title):
+        """返回 (命中的关键词列表（按配置顺序）, 是否命中排除词)"""
+        goto, fail, output = self.goto, self.fail, self.output
+        n_include = self.n_include
+        hits = set()
+        excluded = False
+        state = 0
+        for ch in title:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pid in output[state]:
+                if pid < n_include:
+                    hits.add(pid)
+                else:
+                    excluded = True
+        return [self.include[pid] for pid in sorted(hits)], excluded
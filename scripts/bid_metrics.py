@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger()
+
+# 延迟直方图的分桶上界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# JSON 快照的写出间隔（秒）
+SNAPSHOT_INTERVAL = 60
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """按标签值分组的指标，线程安全：适配器在线程池里更新，HTTP 端点在自己的线程里读取"""
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, key)} {value}")
+        return lines
+
+    def snapshot(self):
+        with self.lock:
+            return [{"labels": dict(zip(self.labels, key)), "value": value} for key, value in sorted(self.values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # 各桶计数（非累计）+ 溢出桶，以及总和、次数
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            i = 0
+            while i < len(self.buckets) and value > self.buckets[i]:
+                i += 1
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        return Timer(self, labels)
+
+    def render(self):
+        lines = self.header()
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{format_labels(self.labels, key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+    def snapshot(self):
+        samples = []
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                buckets = {}
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += n
+                    buckets[str(bound)] = cumulative
+                samples.append({"labels": dict(zip(self.labels, key)), "buckets": buckets, "sum": total, "count": count})
+        return samples
+
+
+class Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus 文本格式"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {
+            "time": time.time(),
+            "pid": os.getpid(),
+            "metrics": {
+                metric.name: {"type": metric.kind, "help": metric.help, "samples": metric.snapshot()}
+                for metric in self.metrics
+            },
+        }
+
+    def write_snapshot(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+# 请求：按 (站点, 查询类型)
+REQUEST_SECONDS = REGISTRY.histogram("bid_request_seconds", "站点接口请求耗时（秒）", ("site", "type"))
+RESPONSE_BYTES = REGISTRY.counter("bid_response_bytes_total", "接收的响应字节数", ("site", "type"))
+RETRIES = REGISTRY.counter("bid_retries_total", "重试次数：urllib3 状态码重试、登录失效重新预热、buildId 404 重取", ("site", "reason"))
+HTTP_ERRORS = REGISTRY.counter("bid_http_errors_total", "HTTP 错误状态码与请求异常", ("site", "status"))
+# 公告漏斗：按 (站点, 公告类型)，stage 依次为 returned（接口返回）、in_window（在时间窗口内）、
+# matched（命中关键词）、new（未推送过）、notified（未命中排除词，已加入汇总）
+ITEMS = REGISTRY.counter("bid_items_total", "各阶段的公告条数", ("site", "type", "stage"))
+UNCHANGED = REGISTRY.counter("bid_unchanged_total", "响应与上次相同、跳过解析的次数，kind 为 not_modified（304）或 digest（内容摘要相同）", ("site", "kind"))
+DEDUP_HITS = REGISTRY.counter("bid_dedup_hits_total", "去重命中次数，layer 为 filter（内存过滤器）或 store（SQLite）", ("site", "layer"))
+# 轮次与查询
+CYCLE_SECONDS = REGISTRY.histogram("bid_cycle_seconds", "站点每轮抓取耗时（秒）", ("site",))
+SEARCH_SECONDS = REGISTRY.histogram("bid_search_seconds", "单个查询（含所有类型和翻页）耗时（秒）", ("site", "query"))
+# 推送
+WEBHOOK_SECONDS = REGISTRY.histogram("bid_webhook_seconds", "企业微信 webhook 调用耗时（秒）", ("bot",))
+WEBHOOK_ERRCODES = REGISTRY.counter("bid_webhook_errcode_total", "企业微信 webhook 返回的 errcode", ("bot", "errcode"))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """在后台线程提供 /metrics，返回 server（调用 shutdown() 停止）"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="bid-metrics", daemon=True).start()
+    logger.info(f"指标端点: http://{host}:{server.server_port}/metrics")
+    return server
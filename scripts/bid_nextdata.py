@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import time
+import codecs
+import logging
+import threading
+
+from bid_common import LOG_DIR
+from bid_metrics import RETRIES
+
+logger = logging.getLogger()
+
+# 能力电源 search.json 中公告列表的位置：pageProps.initialState.searchArticlesList.data.articles
+ARTICLES_PATH = ("pageProps", "initialState", "searchArticlesList", "data", "articles")
+ARTICLES_ANCHOR = b'"searchArticlesList"'
+ARTICLES_KEY = b'"articles"'
+WHITESPACE = " \t\n\r"
+# 增量解码时每次处理的字节数
+CHUNK_SIZE = 16 * 1024
+
+# Next.js 的 buildId 缓存，跨进程重启复用
+BUILD_FILE = os.path.join(LOG_DIR, "nextjs_build.json")
+# 页面里的 buildId：__NEXT_DATA__ 中的 "buildId"，或静态资源路径 /_next/static/<buildId>/_buildManifest.js
+BUILD_ID_PATTERNS = (
+    re.compile(r'"buildId"\s*:\s*"([^"]+)"'),
+    re.compile(r'/_next/static/([^/"]+)/_(?:buildManifest|ssgManifest)\.js'),
+)
+
+_decoder = json.JSONDecoder()
+_build_file_lock = threading.Lock()
+# orjson 在第一次整包解码时才导入，不拖慢启动；None 表示还没导入过，False 表示未安装
+_orjson = None
+
+
+def get_orjson():
+    """返回 orjson 模块，未安装返回 None"""
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+        except ImportError:
+            orjson = False
+        _orjson = orjson
+    return _orjson or None
+
+
+def loads(content):
+    """整包解码：有 orjson 时用 orjson，否则用标准库"""
+    orjson = get_orjson()
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def find_array(content, anchor=ARTICLES_ANCHOR, key=ARTICLES_KEY):
+    """在原始字节里定位 anchor 之后第一个 key 对应数组的 '[' 位置，找不到返回 -1"""
+    pos = content.find(anchor)
+    if pos < 0:
+        return -1
+    pos = content.find(key, pos + len(anchor))
+    if pos < 0:
+        return -1
+    pos += len(key)
+    while pos < len(content) and content[pos] in b" \t\n\r:":
+        pos += 1
+    if content[pos:pos + 1] != b"[":
+        return -1
+    return pos
+
+
+class ArrayReader:
+    """从 content[pos] 的 '[' 开始逐个解码数组元素：响应字节按 CHUNK_SIZE 增量解码成文本，
+    已解码的元素随即丢弃，内存只与单个元素和一个分块有关"""
+    def __init__(self, content, pos, chunk_size=CHUNK_SIZE):
+        self.view = memoryview(content)
+        self.offset = pos + 1
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.i = 0
+
+    def fill(self):
+        """再解码一块，同时丢掉已消费的文本；已到末尾返回 False"""
+        if self.offset >= len(self.view):
+            return False
+        chunk = self.view[self.offset:self.offset + self.chunk_size]
+        self.offset += len(chunk)
+        self.text = self.text[self.i:] + self.decoder.decode(chunk, self.offset >= len(self.view))
+        self.i = 0
+        return True
+
+    def peek(self):
+        """跳过空白，返回下一个非空白字符"""
+        while True:
+            while self.i < len(self.text) and self.text[self.i] in WHITESPACE:
+                self.i += 1
+            if self.i < len(self.text):
+                return self.text[self.i]
+            if not self.fill():
+                raise ValueError("JSON 数组不完整")
+
+    def decode(self):
+        while True:
+            try:
+                item, end = _decoder.raw_decode(self.text, self.i)
+                # 元素恰好在分块末尾结束时可能被截断（如数字），多读一块再确认
+                if end < len(self.text):
+                    self.i = end
+                    return item
+            except json.JSONDecodeError:
+                pass
+            if not self.fill():
+                item, self.i = _decoder.raw_decode(self.text, self.i)
+                return item
+
+    def __iter__(self):
+        while True:
+            if self.peek() == "]":
+                return
+            yield self.decode()
+            if self.peek() == ",":
+                self.i += 1
+
+
+def iter_dlny_articles(content):
+    """逐条产出 (articleId, title, noticeTime 毫秒)。
+    只解码 articles 数组本身，不构建整个页面状态，也不解码数组之后的内容；结构变化找不到数组时退回整包解码"""
+    pos = find_array(content)
+    if pos >= 0:
+        articles = ArrayReader(content, pos)
+    else:
+        data = loads(content)
+        for key in ARTICLES_PATH:
+            data = data[key]
+        articles = data
+    for article in articles:
+        yield article['articleId'], article['title'], article['noticeTime']
+
+
+def extract_build_id(html):
+    for pattern in BUILD_ID_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+
+class NextBuild:
+    """Next.js 站点的 buildId：数据接口 /_next/data/<buildId>/... 随每次部署变化。
+    平时直接使用缓存值（进程内 + 文件），只有接口返回 404 时才请求一次页面重新发现，
+    并发的多个请求同时遇到 404 时只有第一个去发现，其余复用新值"""
+    def __init__(self, name, page_url, seed=None, path=BUILD_FILE):
+        self.name = name
+        self.page_url = page_url
+        self.path = path
+        self.lock = threading.Lock()
+        self.build_id = self.load() or seed
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)[self.name]["build_id"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self):
+        with _build_file_lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    builds = json.load(f)
+            except (OSError, ValueError):
+                builds = {}
+            builds[self.name] = {"build_id": self.build_id, "discovered_at": time.time()}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(builds, f)
+            os.replace(tmp, self.path)
+
+    def get(self, session):
+        if self.build_id is None:
+            return self.refresh(session, None)
+        return self.build_id
+
+    def refresh(self, session, stale):
+        """stale 是刚刚返回 404 的 buildId；若其他线程已经换成新值则直接返回"""
+        with self.lock:
+            if self.build_id is not None and self.build_id != stale:
+                return self.build_id
+            response = session.get(self.page_url, timeout=60)
+            if response.status_code != 200:
+                raise ValueError(f"{self.name} 获取 buildId 失败: {self.page_url} 返回 {response.status_code}")
+            build_id = extract_build_id(response.text)
+            if build_id is None:
+                raise ValueError(f"{self.name} 获取 buildId 失败: {self.page_url} 中未找到 buildId")
+            logger.info(f"{self.name} buildId 更新: {stale} -> {build_id}")
+            self.build_id = build_id
+            self.save()
+            return build_id
+
+    def request(self, session, method, path, **kwargs):
+        """请求 /_next/data/<buildId>/<path>，404 时重新发现 buildId 后重试一次"""
+        build_id = self.get(session)
+        response = session.request(method, self.data_url(build_id, path), **kwargs)
+        if response.status_code == 404:
+            logger.info(f"{self.name} buildId {build_id} 返回 404，重新获取")
+            RETRIES.inc(site=self.name, reason="build_id")
+            build_id = self.refresh(session, build_id)
+            response = session.request(method, self.data_url(build_id, path), **kwargs)
+        return response
+
+    def data_url(self, build_id, path):
+        base = self.page_url.split("/", 3)
+        return f"{base[0]}//{base[2]}/_next/data/{build_id}/{path}"
@@ -0,0 +1,197 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger()
+
+# 企业微信群机器人限制：文本内容不超过 2048 字节，每个机器人每分钟最多 20 条
+WECOM_MAX_BYTES = 2048
+WECOM_RATE = 20
+WECOM_PERIOD = 60
+# 值得重试的 errcode：45009 为触发频率限制，-1 为 WeComWebhook 的请求异常（网络、超时等）
+RETRY_ERRCODES = (45009, -1)
+MAX_RETRIES = 3
+# 多次重试仍失败的消息重新入队，队列满时等这么久（秒）再试
+REQUEUE_DELAY = WECOM_PERIOD
+# 待发送队列长度，满了之后抓取协程在 send() 处等待（背压）
+QUEUE_SIZE = 100
+# 汇总推送的间隔（秒）：期间所有站点的新公告合并发送
+DIGEST_INTERVAL = 60
+# 汇总最多攒多少条公告，攒满即刻发送；发送队列也满时 add() 等待，背压传回抓取协程
+DIGEST_MAX_ITEMS = 50
+
+
+def split_message(content, max_bytes=WECOM_MAX_BYTES, sep="\n\n"):
+    """按字节数拆分消息：优先在条目分隔符处切分，单条超长时按字符边界硬切"""
+    chunks = []
+    current = ""
+    for part in content.split(sep):
+        candidate = part if not current else current + sep + part
+        if len(candidate.encode("utf-8")) <= max_bytes:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        current = ""
+        while len(part.encode("utf-8")) > max_bytes:
+            cut = part.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore")
+            chunks.append(cut)
+            part = part[len(cut):]
+        current = part
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class SlidingWindow:
+    """滑动窗口限流：任意 period 秒内最多 rate 次。记录的是调用完成的时刻（不早于服务端收到的时刻），
+    保证按服务端的计时也不会超限"""
+    def __init__(self, rate=WECOM_RATE, period=WECOM_PERIOD):
+        self.rate = rate
+        self.period = period
+        self.sent = deque()
+
+    async def wait(self):
+        while True:
+            now = time.monotonic()
+            while self.sent and self.sent[0] <= now - self.period:
+                self.sent.popleft()
+            if len(self.sent) < self.rate:
+                return
+            await asyncio.sleep(self.sent[0] + self.period - now)
+
+    def record(self):
+        self.sent.append(time.monotonic())
+
+
+class WeComSender:
+    """后台投递：抓取协程只负责入队，由单个 worker 按滑动窗口节奏调用 webhook，
+    遇到频率限制或请求异常时退避重试，仍失败则重新入队，不丢消息"""
+    def __init__(self, webhook, call, queue_size=QUEUE_SIZE):
+        self.webhook = webhook
+        self.call = call
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.window = SlidingWindow()
+        self.worker = None
+
+    def start(self):
+        if self.worker is None:
+            self.worker = asyncio.create_task(self.run())
+
+    async def send(self, content):
+        self.start()
+        for chunk in split_message(content):
+            await self.queue.put(chunk)
+
+    async def deliver(self, chunk):
+        """投递一条；返回 False 表示多次重试后仍是频率限制或请求异常"""
+        for attempt in range(MAX_RETRIES + 1):
+            await self.window.wait()
+            result = await self.call(self.webhook.send_text, chunk)
+            self.window.record()
+            if result.get("errcode") not in RETRY_ERRCODES:
+                if result.get("errcode"):
+                    logger.error(f"消息发送失败: {result}")
+                return True
+            logger.info(f"消息发送失败（errcode {result.get('errcode')}），第 {attempt + 1} 次退避")
+            await asyncio.sleep(WECOM_PERIOD / WECOM_RATE * 2 ** attempt)
+        return False
+
+    async def requeue(self, chunk):
+        """放回队尾，后面的消息先发；队列满时稍后再试"""
+        while True:
+            try:
+                self.queue.put_nowait(chunk)
+                return
+            except asyncio.QueueFull:
+                await asyncio.sleep(REQUEUE_DELAY)
+
+    async def run(self):
+        while True:
+            chunk = await self.queue.get()
+            try:
+                if not await self.deliver(chunk):
+                    logger.error("消息发送失败: 多次重试仍未成功，重新入队")
+                    await self.requeue(chunk)
+            except Exception as e:
+                logger.error(f"消息发送失败: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    async def close(self, timeout=None):
+        """等待队列发完后停止 worker；默认按队列长度和频率限制估算等待时间"""
+        if self.worker is None:
+            return
+        if timeout is None:
+            timeout = (self.queue.qsize() / WECOM_RATE + 1) * WECOM_PERIOD
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"退出时仍有 {self.queue.qsize()} 条消息未发送")
+        self.worker.cancel()
+
+
+class Digest:
+    """汇总一段时间内（跨站点）所有新公告，按站点、类型分组并标注命中的关键词，
+    定时或攒满 max_items 条时合并成尽量少的消息交给 WeComSender"""
+    def __init__(self, sender, interval=DIGEST_INTERVAL, max_items=DIGEST_MAX_ITEMS):
+        self.sender = sender
+        self.interval = interval
+        self.max_items = max_items
+        self.groups = {}
+        self.count = 0
+        # 定时汇总与攒满汇总可能同时发生，串行入队保证消息顺序
+        self.lock = asyncio.Lock()
+        # close() 用它让定时循环在两次汇总之间退出，而不是取消正在入队的汇总
+        self.stopping = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def add(self, com_key, bid, keywords):
+        self.start()
+        self.groups.setdefault((com_key, bid.type), []).append((bid, keywords))
+        self.count += 1
+        if self.count >= self.max_items:
+            await self.flush()
+
+    def render(self):
+        blocks = []
+        for (com_key, type), items in self.groups.items():
+            header = f"〓{com_key}｜{type}〓" if type else f"〓{com_key}〓"
+            # 组内按发布时间从新到旧
+            items.sort(key=lambda item: -item[0].ts)
+            for i, (bid, keywords) in enumerate(items):
+                lines = [header] if i == 0 else []
+                lines.append(f"【标题】{bid.title}")
+                lines.append(f"【链接】{bid.url}")
+                lines.append(f"【关键词】{'、'.join(keywords)}")
+                blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    async def flush(self):
+        async with self.lock:
+            if not self.groups:
+                return
+            content = self.render()
+            self.groups = {}
+            self.count = 0
+            await self.sender.send(content)
+
+    async def run(self):
+        while not self.stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def close(self):
+        """停止定时循环并等它把正在进行的汇总送进发送队列，再把剩下的发出去"""
+        self.stopping.set()
+        if self.task is not None:
+            await self.task
+        await self.flush()
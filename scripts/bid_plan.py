@@ -0,0 +1,24 @@
+import logging
+
+logger = logging.getLogger()
+
+# 查询方式：
+#   collapse  去掉包含其他关键词的关键词（"会议服务" 已被 "会议" 的结果覆盖）
+#   sweep     接口支持空标题时，只查 "最新 N 条"，所有关键词在本地匹配
+# 关键词搜索站点都只返回固定条数的一页、不能翻页，且多为全文检索：用公共词（如 "服务"）合并查询时，
+# 命中变多会把窗口内的公告挤出这一页，所以不做合并
+PLAN_MODES = ("collapse", "sweep")
+
+
+def collapse_keywords(keywords):
+    """去重并去掉包含其他关键词的关键词，保持原顺序"""
+    unique = list(dict.fromkeys(k for k in keywords if k))
+    return [k for k in unique if not any(other != k and other in k for other in unique)]
+
+
+def plan_queries(keywords, mode="collapse"):
+    """计算某个站点一轮需要发出的最少查询"""
+    if mode == "sweep":
+        return [""]
+    return collapse_keywords(keywords)
+
@@ -0,0 +1,64 @@
+import hashlib
+from datetime import datetime
+from typing import NamedTuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from bid_common import BEIJING_TZ
+
+# 链接里可作为公告主键的参数：docId / noticeId / articleId / pkId 在各站点的链接里分别叫这些名字
+ID_PARAMS = ("id", "articleId", "docId", "noticeId", "pkId")
+
+
+def canonical_id(site, link):
+    """由链接得到稳定的公告主键：优先取 id 类参数（含 #/ 路由里的参数），否则用规范化后的链接"""
+    parts = urlsplit(link)
+    query = parts.query
+    path = parts.path
+    if not query and "?" in parts.fragment:
+        path, query = parts.fragment.split("?", 1)
+    params = dict(parse_qsl(query))
+    for name in ID_PARAMS:
+        if params.get(name):
+            return f"{site}:{params[name]}"
+    # 如 dlnyzb 的 /detail/<articleId>
+    normalized = parts.netloc.lower() + path.rstrip("/")
+    if params:
+        normalized += "?" + urlencode(sorted(params.items()))
+    return f"{site}:{normalized}"
+
+
+def record_id(key):
+    """主键字符串的 64 位哈希（有符号，可直接作为 SQLite INTEGER 主键）"""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def parse_ts(text):
+    """站点返回的北京时间字符串（"YYYY-MM-DD" 或 "YYYY-MM-DD HH:MM:SS"）转 epoch 秒"""
+    return int(datetime.fromisoformat(text).replace(tzinfo=BEIJING_TZ).timestamp())
+
+
+def bound_ts(start_time):
+    """抓取下限转 epoch 秒：date 取北京时间当天零点，datetime 取其时刻"""
+    if not isinstance(start_time, datetime):
+        start_time = datetime(start_time.year, start_time.month, start_time.day, tzinfo=BEIJING_TZ)
+    return int(start_time.timestamp())
+
+
+def day_start_ts(ts):
+    """epoch 秒所在北京时间当天零点的 epoch 秒"""
+    return bound_ts(datetime.fromtimestamp(ts, BEIJING_TZ).date())
+
+
+class Announcement(NamedTuple):
+    """一条公告：不可变、无 __dict__，去重、过滤、排序都在整数 id / ts 上进行"""
+    id: int         # canonical_id 的 64 位哈希
+    site: str
+    type: str
+    title: str
+    url: str
+    ts: int         # 发布时间，epoch 秒；只有日期的站点取北京时间当天零点
+
+    @classmethod
+    def make(cls, site, title, url, ts, type=""):
+        return cls(record_id(canonical_id(site, url)), site, type, title, url, int(ts))
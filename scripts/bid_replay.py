@@ -0,0 +1,377 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import bid_common
+import bid_store
+from bid_common import BASE_DIR, BEIJING_TZ, load_config, beijing_now, set_transport, retry_strategy
+from bid_sites import SITES
+from bid_plan import plan_queries
+
+# 录制的响应默认放在这里：<目录>/<站点>/<序号>.json（请求与响应元数据）+ <序号>.body（响应体）
+FIXTURE_DIR = os.path.join(BASE_DIR, "fixtures")
+# 回放时保留的响应头；Content-Encoding 不保留，录制的响应体已经解压
+KEEP_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+# 回放时不需要录制、直接应答的主机（企业微信 webhook）
+STUB_HOSTS = {"qyapi.weixin.qq.com": b'{"errcode":0,"errmsg":"ok"}'}
+# 响应体里的北京时间："YYYY-MM-DD" 或 "YYYY-MM-DD HH:MM:SS"（也接受 T 分隔）
+TIME_TEXT = re.compile(rb"(?<!\d)(\d{4}-\d{2}-\d{2})(?:([ T])(\d{2}:\d{2}:\d{2}))?(?!\d)")
+# 响应体里的毫秒时间戳字段，如 "noticeTime": 1753660800000
+TIME_MS = re.compile(rb'("\w*[Tt]ime"\s*:\s*)(\d{13})(?!\d)')
+# 请求里随时间变化的部分（日期、时刻、毫秒时间戳，含 URL 编码），匹配录制响应前先抹掉
+VOLATILE = re.compile(rb"\d{4}-\d{2}-\d{2}(?:(?:[ T+]|%20)\d{2}(?::|%3A)\d{2}(?::|%3A)\d{2})?|(?<!\d)1\d{12}(?!\d)")
+
+
+def request_key(method, url, body):
+    """录制与回放共用的请求键：方法 + URL + 请求体，时间相关的部分不参与匹配"""
+    if body is None:
+        body = b""
+    elif isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha1(VOLATILE.sub(b"~", url.encode("utf-8")) + b"\n" + VOLATILE.sub(b"~", body))
+    return f"{method} {digest.hexdigest()}"
+
+
+def endpoint_key(method, url):
+    """按接口匹配的退路：方法 + 主机 + 路径（去掉查询参数）"""
+    parts = urlsplit(url)
+    return f"{method} {parts.netloc}{parts.path}"
+
+
+def shift_times(body, recorded_at, now=None):
+    """把录制响应里的发布时间平移到回放时刻：带时刻的按秒平移，只有日期的按天平移，
+    这样回放时公告仍落在时间窗口内，过滤、去重、推送走的是和录制时相同的路径"""
+    now = now or time.time()
+    delta = timedelta(seconds=now - recorded_at)
+    days = timedelta(days=(datetime.fromtimestamp(now, BEIJING_TZ).date()
+                           - datetime.fromtimestamp(recorded_at, BEIJING_TZ).date()).days)
+
+    def shift_text(match):
+        day, sep, clock = match.groups()
+        try:
+            if clock is None:
+                return (datetime.strptime(day.decode(), "%Y-%m-%d") + days).strftime("%Y-%m-%d").encode()
+            moment = datetime.strptime(f"{day.decode()} {clock.decode()}", "%Y-%m-%d %H:%M:%S") + delta
+        except ValueError:
+            return match.group(0)
+        return moment.strftime(f"%Y-%m-%d{sep.decode()}%H:%M:%S").encode()
+
+    def shift_ms(match):
+        return match.group(1) + str(int(match.group(2)) + int(delta.total_seconds() * 1000)).encode()
+
+    return TIME_MS.sub(shift_ms, TIME_TEXT.sub(shift_text, body))
+
+
+class RecordingAdapter(HTTPAdapter):
+    """照常联网，同时把每个请求的响应写进站点的录制目录"""
+    def __init__(self, name, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = os.path.join(directory, name)
+        self.lock = threading.Lock()
+        self.count = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.save(request, response)
+        return response
+
+    def save(self, request, response):
+        with self.lock:
+            self.count += 1
+            path = os.path.join(self.directory, f"{self.count:04d}")
+        meta = {
+            "method": request.method,
+            "url": request.url,
+            "key": request_key(request.method, request.url, request.body),
+            "endpoint": endpoint_key(request.method, request.url),
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in KEEP_HEADERS if name in response.headers},
+            "elapsed": response.elapsed.total_seconds(),
+            "recorded_at": time.time(),
+        }
+        with open(path + ".body", 'wb') as f:
+            f.write(response.content)
+        with open(path + ".json", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+
+
+class ReplayAdapter(HTTPAdapter):
+    """不联网，从录制目录应答：先按请求键精确匹配，再按接口匹配，同一键的多份录制轮流返回。
+    latency 为 None 时按录制时的响应耗时 * latency_scale 等待，否则固定等待 latency 秒，再加 ±jitter 的均匀抖动；
+    error_rate 的概率返回 error_status，drop_rate 的概率直接抛连接异常"""
+    def __init__(self, name, directory, latency=None, latency_scale=1.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, drop_rate=0.0, seed=None):
+        super().__init__()
+        self.name = name
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.count = 0
+        self.misses = 0
+        self.by_key = {}
+        self.by_endpoint = {}
+        self.turns = {}
+        self.load(os.path.join(directory, name))
+
+    def load(self, directory):
+        if not os.path.isdir(directory):
+            return
+        now = time.time()
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(directory, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                fixture = json.load(f)
+            with open(path[:-len(".json")] + ".body", 'rb') as f:
+                fixture["body"] = shift_times(f.read(), fixture["recorded_at"], now)
+            self.by_key.setdefault(fixture["key"], []).append(fixture)
+            self.by_endpoint.setdefault(fixture["endpoint"], []).append(fixture)
+
+    def pick(self, table, key):
+        fixtures = table.get(key)
+        if not fixtures:
+            return None
+        with self.lock:
+            turn = self.turns.get(key, 0)
+            self.turns[key] = turn + 1
+        return fixtures[turn % len(fixtures)]
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        host = urlsplit(request.url).netloc
+        if host in STUB_HOSTS:
+            return self.respond(request, 200, {"Content-Type": "application/json"}, STUB_HOSTS[host])
+        with self.lock:
+            self.count += 1
+        fixture = (self.pick(self.by_key, request_key(request.method, request.url, request.body))
+                   or self.pick(self.by_endpoint, endpoint_key(request.method, request.url)))
+        if fixture is None:
+            with self.lock:
+                self.misses += 1
+            return self.respond(request, 404, {}, b"")
+        if self.latency is None:
+            delay = fixture["elapsed"] * self.latency_scale
+        else:
+            delay = self.latency
+        delay += self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        roll = self.random.random()
+        if roll < self.drop_rate:
+            raise requests.exceptions.ConnectionError(f"回放注入的连接异常: {request.url}", request=request)
+        if roll < self.drop_rate + self.error_rate:
+            return self.respond(request, self.error_status, {}, b"")
+        return self.respond(request, fixture["status"], fixture["headers"], fixture["body"])
+
+    def respond(self, request, status, headers, body):
+        raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status, preload_content=False)
+        return self.build_response(request, raw)
+
+
+def start_time_for(site, beijing_time):
+    """与 Engine.start_time 相同：按天过滤的站点取当天日期，否则往回看 lookback"""
+    if site["lookback"] == "day":
+        return beijing_time.date()
+    return beijing_time - site["lookback"]
+
+
+def isolate(workdir):
+    """去重库、游标、发布速率、buildId 缓存都写到临时目录，录制和基准不动线上状态"""
+    bid_store.set_cursor_store(os.path.join(workdir, "bid_seen.db"))
+    for site in SITES.values():
+        build = site["source"].get("build")
+        if build is not None:
+            build.path = os.path.join(workdir, "nextjs_build.json")
+
+
+def record(site_names, directory):
+    """对每个站点按查询计划真实查询一遍，响应写入录制目录；只抓取不推送"""
+    set_transport(lambda name: RecordingAdapter(name, directory, pool_connections=4, pool_maxsize=16, max_retries=retry_strategy))
+    isolate(tempfile.mkdtemp(prefix="bid_record_"))
+    keyword_list, _, _ = load_config()
+    for name in site_names:
+        site = SITES[name]
+        queries = plan_queries(keyword_list, site.get("plan", "collapse"))
+        start_time = start_time_for(site, beijing_now())
+        total = 0
+        for i, query in enumerate(queries):
+            if i and site["delay"]:
+                time.sleep(site["delay"])
+            result = site["search"](query, start_time)
+            total += len(result or [])
+        adapter = bid_common.get_session(name).session.get_adapter("https://")
+        print(f"{name}: {len(queries)} 次查询，{adapter.count} 个响应，{total} 条公告 -> {adapter.directory}")
+
+
+def bench_site(name, directory, cycles, replay_options, no_delay=False):
+    """子进程里执行：单站点引擎跑 cycles 轮，返回每轮的耗时、CPU、请求数和进程峰值 RSS"""
+    # 导入放在这里：bid_engine 只在基准子进程里需要
+    from bid_engine import Engine
+    from bid_schedule import PollScheduler
+
+    adapters = {}
+
+    def factory(adapter_name):
+        adapters[adapter_name] = ReplayAdapter(adapter_name, directory, **replay_options)
+        return adapters[adapter_name]
+
+    set_transport(factory)
+    workdir = tempfile.mkdtemp(prefix="bid_bench_")
+    isolate(workdir)
+    # 回放不会真的推送，缺少密钥时填一个占位值，推送路径照常执行
+    os.environ.setdefault(SITES[name]["key_env"], "replay")
+    if no_delay:
+        SITES[name]["delay"] = 0
+    engine = Engine([name], once=True, store=bid_store.SeenStore(os.path.join(workdir, "bid_seen.db")),
+                    scheduler=PollScheduler(os.path.join(workdir, "bid_rates.json")))
+
+    def requests_made():
+        # 站点会话在第一轮首次请求时才创建
+        return adapters[name].count if name in adapters else 0
+
+    async def run_cycles():
+        end_time = beijing_now() + timedelta(hours=1)
+        rows = []
+        for _ in range(cycles):
+            requests_before = requests_made()
+            wall, cpu = time.perf_counter(), time.process_time()
+            await engine.run_site(name, end_time)
+            rows.append({
+                "wall": time.perf_counter() - wall,
+                "cpu": time.process_time() - cpu,
+                "requests": requests_made() - requests_before,
+            })
+        for digest in engine.digests.values():
+            await digest.close()
+        for sender in engine.webhooks.values():
+            if sender is not None:
+                await sender.close()
+        return rows
+
+    rows = asyncio.run(run_cycles())
+    engine.executor.shutdown(wait=False)
+    engine.store.close()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None
+    misses = adapters[name].misses if name in adapters else 0
+    return {"site": name, "cycles": rows, "peak_rss_kb": peak_kb, "misses": misses}
+
+
+def bench(site_names, args):
+    """每个站点一个子进程，峰值 RSS 才是该站点自己的；打印每轮平均值"""
+    print(f"{'站点':<8} {'轮数':>4} {'耗时 ms':>10} {'最长 ms':>10} {'请求/轮':>8} {'CPU ms/轮':>10} {'峰值 RSS MB':>12} {'未命中':>6}")
+    results = []
+    for name in site_names:
+        command = [sys.executable, os.path.abspath(__file__), "bench-site", name] + site_args(args)
+        proc = subprocess.run(command, cwd=BASE_DIR, stdout=subprocess.PIPE, text=True)
+        if proc.returncode != 0:
+            print(f"{name:<8} 基准子进程失败 exitcode={proc.returncode}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(result)
+        rows = result["cycles"]
+        n = len(rows)
+        rss = "-" if result["peak_rss_kb"] is None else f"{result['peak_rss_kb'] / 1024:.1f}"
+        print(f"{name:<8} {n:>4} {sum(r['wall'] for r in rows) / n * 1000:>10.1f} {max(r['wall'] for r in rows) * 1000:>10.1f} "
+              f"{sum(r['requests'] for r in rows) / n:>8.1f} {sum(r['cpu'] for r in rows) / n * 1000:>10.1f} {rss:>12} {result['misses']:>6}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+
+
+def add_replay_options(parser):
+    parser.add_argument("--dir", default=FIXTURE_DIR, help="录制目录")
+    parser.add_argument("--cycles", type=int, default=3, help="每个站点跑几轮")
+    parser.add_argument("--latency", type=float, default=None, help="固定响应延迟（毫秒），默认按录制时的耗时")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="按录制耗时回放时的倍数")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟的均匀抖动（± 毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误状态码的概率")
+    parser.add_argument("--error-status", type=int, default=503, help="注入的错误状态码")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="抛出连接异常的概率")
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子，便于复现")
+    parser.add_argument("--no-delay", action="store_true", help="忽略站点配置的请求间隔（delay）")
+
+
+def site_args(args):
+    """把父进程的回放参数原样传给基准子进程"""
+    argv = ["--dir", args.dir, "--cycles", str(args.cycles), "--latency-scale", str(args.latency_scale),
+            "--jitter", str(args.jitter), "--error-rate", str(args.error_rate),
+            "--error-status", str(args.error_status), "--drop-rate", str(args.drop_rate)]
+    if args.latency is not None:
+        argv += ["--latency", str(args.latency)]
+    if args.seed is not None:
+        argv += ["--seed", str(args.seed)]
+    if args.no_delay:
+        argv.append("--no-delay")
+    return argv
+
+
+def replay_options(args):
+    return {
+        "latency": None if args.latency is None else args.latency / 1000,
+        "latency_scale": args.latency_scale,
+        "jitter": args.jitter / 1000,
+        "error_rate": args.error_rate,
+        "error_status": args.error_status,
+        "drop_rate": args.drop_rate,
+        "seed": args.seed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WinBid 录制回放：录制各站点真实响应，离线回放完整的监控轮次并统计开销")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="真实查询各站点一遍，把响应写入录制目录")
+    rec.add_argument("sites", nargs="*", help=f"站点列表，可选 {'/'.join(SITES)}，默认全部启用的站点")
+    rec.add_argument("--dir", default=FIXTURE_DIR, help="录制目录")
+    ben = sub.add_parser("bench", help="回放录制的响应，统计每个站点每轮的耗时、请求数、CPU 和峰值 RSS")
+    ben.add_argument("sites", nargs="*", help="站点列表，默认全部启用的站点")
+    add_replay_options(ben)
+    ben.add_argument("--json", default=None, help="结果另存为 JSON")
+    one = sub.add_parser("bench-site", help=argparse.SUPPRESS)
+    one.add_argument("site")
+    add_replay_options(one)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench-site":
+        result = bench_site(args.site, args.dir, args.cycles, replay_options(args), args.no_delay)
+        print(json.dumps(result))
+        return
+    unknown = [name for name in args.sites if name not in SITES]
+    if unknown:
+        parser.error(f"未知站点: {unknown}")
+    site_names = args.sites or [name for name, site in SITES.items() if site["enabled"]]
+    if args.command == "record":
+        record(site_names, args.dir)
+    else:
+        bench(site_names, args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+import os
+import json
+import random
+import logging
+
+from bid_common import BASE_DIR
+
+logger = logging.getLogger()
+
+RATES_FILE = os.path.join(BASE_DIR, "output", "bid_rates.json")
+# 站点轮询间隔的上下限（秒），站点可在 SITES 里用 min_interval / max_interval 覆盖
+MIN_INTERVAL = 60
+MAX_INTERVAL = 1800
+# 没有历史数据时使用的间隔
+PRIOR_INTERVAL = 120
+# 期望每次轮询平均能拿到的新公告数，越小轮询越勤
+TARGET_PER_POLL = 0.5
+# 指数滑动平均的权重
+ALPHA = 0.1
+# 随机抖动比例，避免固定节拍
+JITTER = 0.2
+
+
+class PollScheduler:
+    """按 (站点, 类型, 星期, 小时) 统计实际新公告的发布速率（条/小时），
+    据此为每个站点计算下一次轮询间隔：发布活跃的时段勤查，夜间和周末放缓"""
+    def __init__(self, path=RATES_FILE):
+        self.path = path
+        self.rates = {}
+        # 本进程更新过的站点；多个进程共用速率文件，保存时只覆盖这些站点
+        self.dirty = set()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.rates = json.load(f)
+            except Exception as e:
+                logger.error(f"发布速率文件读取失败: {str(e)}")
+
+    @staticmethod
+    def bucket(now):
+        return f"{now.weekday()}-{now.hour}"
+
+    def record(self, site, counts, elapsed, now):
+        """counts: {类型: 本轮新公告数}；elapsed: 距上次轮询的秒数"""
+        if elapsed <= 0:
+            return
+        hours = elapsed / 3600
+        bucket = self.bucket(now)
+        site_rates = self.rates.setdefault(site, {})
+        self.dirty.add(site)
+        # 已知类型本轮没有新公告时按 0 计，安静时段才能被识别出来
+        for type in set(site_rates) | set(counts):
+            type_rates = site_rates.setdefault(type, {})
+            observed = counts.get(type, 0) / hours
+            if bucket in type_rates:
+                type_rates[bucket] = ALPHA * observed + (1 - ALPHA) * type_rates[bucket]
+            else:
+                type_rates[bucket] = observed
+
+    def rate(self, site, now):
+        """站点在当前时段的预计发布速率；返回 None 表示该时段还没有数据"""
+        bucket = self.bucket(now)
+        values = [type_rates[bucket] for type_rates in self.rates.get(site, {}).values() if bucket in type_rates]
+        if not values:
+            return None
+        return sum(values)
+
+    def next_interval(self, site, now, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        rate = self.rate(site, now)
+        if rate is None:
+            interval = PRIOR_INTERVAL
+        elif rate <= 0:
+            interval = max_interval
+        else:
+            interval = TARGET_PER_POLL / rate * 3600
+        interval *= random.uniform(1 - JITTER, 1 + JITTER)
+        return min(max(interval, min_interval), max_interval)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        rates = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    rates = json.load(f)
+            except Exception as e:
+                logger.error(f"发布速率文件读取失败: {str(e)}")
+        rates.update({site: self.rates[site] for site in self.dirty})
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(rates, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
@@ -0,0 +1,592 @@
+import re
+import time
+import hashlib
+import logging
+import threading
+import requests
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from bid_common import get_session, response_excerpt
+from bid_record import Announcement, parse_ts, bound_ts, day_start_ts
+from bid_store import get_cursor_store
+from bid_html import iter_ghcg_rows, GHCG_CONTAINER
+from bid_nextdata import NextBuild, iter_dlny_articles
+from bid_metrics import REQUEST_SECONDS, RESPONSE_BYTES, ITEMS, UNCHANGED
+from bid_trace import span, emit, bind, carry, TimedIter
+
+logger = logging.getLogger()
+
+# 空标题 "最新 N 条" 扫描时的每页条数
+SWEEP_PAGE_SIZE = 50
+# 翻页追赶：最多翻几页、页长放大到多少、游标最多往回追多久（秒）
+MAX_PAGES = 10
+MAX_PAGE_SIZE = 100
+MAX_CATCHUP = 24 * 3600
+# 请求模板里的占位符，如 "{keyword}"
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+# 按公告类型并发查询的线程池，每个站点一个，互不占用：慢站点的请求不会让其他站点等线程
+_type_executors = {}
+_type_executors_lock = threading.Lock()
+# 本轮翻页读到的最新公告时间 {(站点, 类型, 查询): epoch 秒}，引擎把本轮结果写入去重库后才推进游标
+_pending_cursors = {}
+_pending_lock = threading.Lock()
+
+
+def type_executor(name):
+    """站点的类型查询线程池，大小为 concurrency × 类型数：引擎对同一主机最多 concurrency 个查询在途，
+    每个查询的所有类型都能同时拿到线程"""
+    executor = _type_executors.get(name)
+    if executor is None:
+        with _type_executors_lock:
+            executor = _type_executors.get(name)
+            if executor is None:
+                site = SITES[name]
+                workers = site["concurrency"] * len(site["source"].get("types", [{}]))
+                executor = _type_executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"bid-{name}")
+    return executor
+
+
+def fan_out(name, func, items):
+    """在站点自己的线程池里并发执行 func，按输入顺序合并结果；任一类型失败（返回 None）则整体返回 None，与串行版本一致。
+    只有一个类型时直接在当前线程执行"""
+    if len(items) == 1:
+        results = [func(items[0])]
+    else:
+        results = type_executor(name).map(carry(func), items)
+    bid_list = []
+    for type_bids in results:
+        if type_bids is None:
+            return None
+        bid_list.extend(type_bids)
+    return bid_list
+
+
+def cursor_bound(cursor_key, start_time):
+    """本次抓取的时间下限：没有游标时取回看窗口；游标只在结果入库后推进，之前的公告都已处理，
+    所以直接以游标为下限，游标落后（停机、长轮次）时向前追赶，但最多追 MAX_CATCHUP"""
+    cursor = get_cursor_store().get(*cursor_key)
+    if cursor is None:
+        return bound_ts(start_time)
+    return max(cursor, time.time() - MAX_CATCHUP)
+
+
+def paginate(cursor_key, fetch_page, page_size, bound):
+    """fetch_page(offset, size) 返回按时间倒序的 [Announcement]。
+    页长固定（不超过 MAX_PAGE_SIZE），offset 按实际返回的条数前进；遇到早于 bound 的公告或空页即停止"""
+    bids = []
+    newest = None
+    offset = 0
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    for _ in range(MAX_PAGES):
+        page = fetch_page(offset, page_size)
+        reached = False
+        for bid in page:
+            if newest is None or bid.ts > newest:
+                newest = bid.ts
+            if bid.ts < bound:
+                reached = True
+                break
+            bids.append(bid)
+        if reached or not page:
+            break
+        if len(page) < page_size:
+            if offset:
+                break
+            # 首页不足页长：可能已到末尾，也可能服务器把页长截小了；以实际条数为页长再取一页
+            page_size = len(page)
+        offset += len(page)
+    else:
+        # 没读到 bound 就停了，中间还有没读的公告，游标不能前进，下一轮仍从原游标读
+        logger.error(f"{cursor_key} 翻页达到上限 {MAX_PAGES} 页，共 {len(bids)} 条，游标不前进")
+        return bids
+    if newest is not None:
+        with _pending_lock:
+            _pending_cursors[cursor_key] = max(newest, _pending_cursors.get(cursor_key, newest))
+    return bids
+
+
+def commit_cursors(name):
+    """本轮结果已写入去重库：推进站点本轮翻页记下的游标"""
+    with _pending_lock:
+        pending = {key: newest for key, newest in _pending_cursors.items() if key[0] == name}
+        for key in pending:
+            del _pending_cursors[key]
+    for key, newest in pending.items():
+        get_cursor_store().advance(*key, newest)
+
+
+def discard_cursors(name, keyword=None):
+    """丢弃没能入库的结果记下的游标，下一轮从原游标重读；keyword 为 None 时丢弃站点的全部"""
+    with _pending_lock:
+        for key in [key for key in _pending_cursors if key[0] == name and keyword in (None, key[2])]:
+            del _pending_cursors[key]
+
+
+class ResponseMemo:
+    """每个 (站点, 类型, 查询, 页) 上次完整处理过的响应：ETag / Last-Modified 用于条件请求，内容摘要用于判断响应未变。
+    响应未变说明其中的公告上次都已处理过，本次直接返回空列表，跳过解码、解析、时间过滤和去重"""
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(name, context):
+        return (name, str(context.get("type", "")), context.get("keyword", ""), context.get("page"), context.get("size"))
+
+    def headers(self, key):
+        """条件请求头；没有记录（首次、被清空）时为空，服务器返回完整内容"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry[1]:
+            headers["If-None-Match"] = entry[1]
+        if entry[2]:
+            headers["If-Modified-Since"] = entry[2]
+        return headers
+
+    def check(self, key, response, region=None):
+        """返回 (kind, digest)：kind 为 "not_modified" / "digest" 表示未变，None 表示有变化或没有记录可对照"""
+        entry = self.entries.get(key)
+        if response.status_code == 304:
+            return ("not_modified", None) if entry is not None else (None, None)
+        content = response.content if region is None else region(response.content)
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        if entry is not None and entry[0] == digest:
+            return "digest", digest
+        return None, digest
+
+    def remember(self, key, response, digest):
+        with self.lock:
+            self.entries[key] = (digest, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    def forget(self, name):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == name]:
+                del self.entries[key]
+
+
+_memo = ResponseMemo()
+
+
+def forget_responses(name):
+    """清空站点的响应记录：本轮处理失败（公告可能没有入库）时调用，下一轮重新完整处理"""
+    _memo.forget(name)
+
+
+def render(template, context):
+    """按上下文填充请求模板：整串只有一个占位符时保留原值类型（如页码为 int），可调用对象以上下文为参数求值"""
+    if callable(template):
+        return template(context)
+    if isinstance(template, dict):
+        return {key: render(value, context) for key, value in template.items()}
+    if isinstance(template, str):
+        match = PLACEHOLDER.fullmatch(template)
+        if match:
+            return context[match.group(1)]
+        return template.format(**context)
+    return template
+
+
+def walk(data, path):
+    """按 JSON 路径取出结果列表；路径不存在（如无结果时不返回 data）按空列表处理"""
+    for key in path:
+        data = data.get(key) if isinstance(data, dict) else None
+    return data if isinstance(data, list) else []
+
+
+def fetch(name, source, session, context, extra_headers=None):
+    """发出一次请求；按 (站点, 查询类型) 记录耗时和响应字节数"""
+    request = source["request"]
+    headers = request.get("headers")
+    if extra_headers:
+        headers = {**(headers or {}), **extra_headers}
+    kwargs = {"headers": headers, "timeout": request.get("timeout", 60)}
+    for body in ("json", "data", "params"):
+        if body in request:
+            kwargs[body] = render(request[body], context)
+    url = render(request["url"], context)
+    type = context.get("label", context.get("type", ""))
+    with REQUEST_SECONDS.time(site=name, type=type), span("request") as request_span:
+        if "build" in source:
+            response = source["build"].request(session, request["method"], url, **kwargs)
+        else:
+            response = session.request(request["method"], url, **kwargs)
+        request_span["bytes"] = len(response.content)
+        request_span["status"] = response.status_code
+    RESPONSE_BYTES.inc(len(response.content), site=name, type=type)
+    response.raise_for_status()
+    return response
+
+
+def parse_rows(source, response):
+    """惰性产出原始结果行：JSON 路径，或站点自己的解析函数"""
+    rows = source["rows"]
+    if callable(rows):
+        yield from rows(response)
+    else:
+        yield from walk(response.json(), rows)
+
+
+def read_records(name, source, session, context, bound=None):
+    """请求一次并转成 [Announcement]；bound 不为 None 时读到早于 bound 的公告即停止（结果按时间倒序）。
+    解析（parse）与建记录、时间过滤（filter）分开计时。响应与上次相同时返回 []"""
+    memo_key = ResponseMemo.key(name, context)
+    response = fetch(name, source, session, context, _memo.headers(memo_key))
+    unchanged, digest = _memo.check(memo_key, response, source.get("digest"))
+    if response.status_code == 304 and unchanged is None:
+        # 发出条件请求后记录被清空（本轮失败时 forget_responses）：304 没有内容可解析，去掉条件头重新完整请求
+        response = fetch(name, source, session, context)
+        unchanged, digest = _memo.check(memo_key, response, source.get("digest"))
+    if unchanged:
+        UNCHANGED.inc(site=name, kind=unchanged)
+        emit("unchanged", 0, kind=unchanged, bytes=len(response.content))
+        return []
+    rows = TimedIter(parse_rows(source, response))
+    start = time.perf_counter()
+    bid_list = []
+    for row in rows:
+        bid = to_record(name, source, row, context)
+        if bid is None:
+            logger.info(f"{SITES[name]['com_key']}，{source['time']}=None, {row.get(source['title'])}")
+            continue
+        ITEMS.inc(site=name, type=bid.type, stage="returned")
+        if bound is not None:
+            if bid.ts < bound:
+                break
+            ITEMS.inc(site=name, type=bid.type, stage="in_window")
+        bid_list.append(bid)
+    elapsed = time.perf_counter() - start
+    # 解析完整结束才记下，解析异常的响应下次照常处理
+    _memo.remember(memo_key, response, digest)
+    emit("parse", rows.elapsed, bytes=len(response.content))
+    emit("filter", elapsed - rows.elapsed, items=len(bid_list))
+    return bid_list
+
+
+def to_record(name, source, row, context):
+    """结果行转 Announcement；缺少发布时间返回 None"""
+    value = row.get(source["time"])
+    if value is None:
+        return None
+    ts = value // 1000 if source.get("time_unit") == "ms" else parse_ts(value)
+    title = row[source["title"]]
+    if "title_strip" in source:
+        title = source["title_strip"].sub('', title)
+    if "type_field" in source:
+        type = row.get(source["type_field"], "")
+    else:
+        type = context.get("label", "")
+    url = source["link"].format(**{**context, **row})
+    return Announcement.make(name, title, url, ts, type)
+
+
+def search_source(name, keyword, start_time):
+    """所有站点共用的抓取流程：预热 -> 按类型并发查询 -> 解析 -> 按时间过滤（翻页站点走游标追赶）"""
+    site = SITES[name]
+    source = site["source"]
+    com_key = site["com_key"]
+    home_url = source.get("home_url")
+    session = get_session(name, home_url=home_url, home_method=source.get("home_method", "GET"))
+    if home_url is not None:
+        try:
+            session.warm_up()
+
+        except Exception as e:
+                logger.error(f"{com_key}，主页请求失败: {str(e)}")
+                return None
+
+    def query_type(type_context):
+        context = {"keyword": keyword, "home_url": home_url, **type_context}
+        bind(type=context.get("label", context.get("type", "")))
+        try:
+            if "page_size" in source:
+                cursor_key = (name, context.get("type", ""), keyword)
+
+                def fetch_page(offset, size):
+                    page_context = {**context, "page": offset // size + 1, "size": size}
+                    return read_records(name, source, session, page_context)
+
+                page_size = source["page_size"] if keyword else SWEEP_PAGE_SIZE
+                bid_list = paginate(cursor_key, fetch_page, page_size, cursor_bound(cursor_key, start_time))
+                for bid in bid_list:
+                    ITEMS.inc(site=name, type=bid.type, stage="in_window")
+                return bid_list
+
+            # 不翻页的站点结果按时间倒序，读到早于下限的公告即停止
+            bound = bound_ts(start_time)
+            if source.get("bound") == "day":
+                bound = day_start_ts(bound)
+            return read_records(name, source, session, context, bound)
+
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"{com_key}，API请求失败: 状态码 {e.response.status_code}, 响应内容: {response_excerpt(name, e.response)}")
+            return None
+
+    # 多个公告类型并发查询，结果按类型顺序合并
+    bid_list = fan_out(name, query_type, source.get("types", [{}]))
+    if bid_list is None:
+        # 任一类型失败时整个查询的结果都被丢弃，成功类型记下的响应和游标也要清掉，下一轮重新处理
+        forget_responses(name)
+        discard_cursors(name, keyword)
+    return bid_list
+
+
+def ghcg_rows(response):
+    """国和采购返回 HTML，只解析结果容器"""
+    for title, published, href in iter_ghcg_rows(response.text):
+        yield {"title": title, "published": published, "href": href}
+
+
+def dlny_rows(response):
+    """能力电源返回整页 Next.js 状态，只解码 articles 数组"""
+    for articleId, title, noticeTime in iter_dlny_articles(response.content):
+        yield {"articleId": articleId, "title": title, "noticeTime": noticeTime}
+
+
+def ghcg_region(content):
+    """国和采购整页 HTML 的页头、导航可能带动态内容，只对结果容器开始之后的部分取摘要"""
+    pos = content.find(GHCG_CONTAINER.encode())
+    return content if pos < 0 else content[pos:]
+
+
+def gept_date(days=0):
+    return lambda context: (date.today() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+# 站点登记表：
+#   com_key     站点中文名（日志、消息前缀）
+#   host        用于按主机限制并发
+#   source      抓取描述，由 search_source 统一执行：
+#     home_url / home_method  需要预热（取 cookie）的主页
+#     request     method、url、headers、timeout，以及 json / data / params 请求模板；
+#                 模板里可用 {keyword}、{page}、{size} 和 types 中的字段，可调用对象以上下文为参数求值
+#     build       Next.js 站点的 NextBuild，url 为 /_next/data/<buildId>/ 之后的路径
+#     types       按公告类型分别查询时每个类型的上下文，label 为消息中的类型名
+#     rows        结果列表的 JSON 路径，或 rows(response) -> 可迭代的结果行
+#     title / time / link     标题字段、时间字段（北京时间字符串，time_unit="ms" 为毫秒时间戳）、链接模板
+#     title_strip 从标题中删除的内容（正则）
+#     type_field  类型取自结果行的哪个字段；不设则用 types 的 label
+#     page_size   设置后按游标翻页追赶（结果须按时间倒序），值为带关键词查询时的页长
+#     bound       "day" 表示按发布日期过滤（不早于下限当天零点）
+#     digest      digest(content) -> 参与响应摘要比较的部分，默认整个响应体
+#   search      search(keyword, start_time) -> [Announcement] | None，默认由 source 生成
+#   key_env     推送使用的 webhook 环境变量
+#   lookback    时间窗口；"day" 表示按当天日期过滤
+#   concurrency 同一主机同时在途的请求上限
+#   delay       同一主机两次请求之间的最小间隔（秒）
+#   plan        查询计划方式，见 bid_plan.PLAN_MODES，默认 collapse
+#   not_extra   额外的排除词
+#   enabled     默认是否启用
+SITES = {
+    "zgdx": {
+        "com_key": "中国电信",
+        "host": "caigou.chinatelecom.com.cn",
+        "plan": "sweep",
+        "source": {
+            "home_url": "https://caigou.chinatelecom.com.cn",
+            "request": {
+                "method": "POST",
+                "url": "https://caigou.chinatelecom.com.cn/portal/base/announcementJoin/queryListNew",
+                "headers": {'Content-Type': 'application/json;charset=UTF-8'},
+                "json": {
+                    "title": "{keyword}",
+                    "type": "{type}",
+                    "pageSize": "{size}",
+                    "pageNum": "{page}",
+                    "noticeSummary": "",
+                    "provinceCode": ""
+                },
+            },
+            # type 为查询参数，type_id 为详情页链接里的类型
+            "types": [
+                {"type": type, "type_id": type_id} for type, type_id in zip(
+                    ["xi9s", "e2no", "e3erht", "ru7of", "e8vif", "ds3fd2s", "f1f7e", "n0eves", "ow7t", "th4gie", "s1x5e"],
+                    ["6", "1", "3", "4", "5", "14", "3", "7", "2", "8", "7"],
+                )
+            ],
+            "rows": ("data", "pageInfo", "list"),
+            "title": "docTitle",
+            "time": "createDate",
+            "type_field": "docType",
+            "link": "{home_url}/DeclareDetails?id={docId}&type={type_id}&docTypeCode={docTypeCode}&securityViewCode={securityViewCode}",
+            "page_size": 10,
+        },
+        "key_env": "key_main",
+        "lookback": timedelta(minutes=20),
+        "concurrency": 4,
+        "delay": 0,
+        "enabled": True,
+    },
+    "zgtt": {
+        "com_key": "中国铁塔",
+        "host": "www.tower.com.cn",
+        "plan": "sweep",
+        "source": {
+            "home_url": "http://www.tower.com.cn/#/purAnnouncement?name=more&purchaseNoticeType=2&activeIndex=0",
+            "request": {
+                "method": "POST",
+                "url": "http://www.tower.com.cn/supportal/v1/obp-notice/query-notice",
+                "headers": {'Content-Type': 'application/json;charset=UTF-8'},
+                "timeout": 120,
+                "json": {
+                    "noticeTitle": "{keyword}",
+                    "purchaseNoticeType": "{type}",
+                    "orgName": "",
+                    "times": "",
+                    "transformationField": "",
+                    "conversionMethod": "",
+                    "current": "{page}",
+                    "size": "{size}"
+                },
+            },
+            "types": [
+                {"type": "2", "label": "采购公告"},
+                {"type": "45", "label": "候选人及结果公示"},
+            ],
+            "rows": ("data", "records"),
+            "title": "noticeTitle",
+            "time": "createTime",
+            "link": "http://www.tower.com.cn/#/noticeDetail?id={noticeId}",
+            "page_size": 20,
+        },
+        "key_env": "key_jk",
+        "lookback": timedelta(minutes=20),
+        "concurrency": 4,
+        "delay": 0,
+        "enabled": True,
+    },
+    "zgyz": {
+        "com_key": "中国邮政",
+        "host": "iframe.chinapost.com.cn",
+        "source": {
+            "request": {
+                "method": "POST",
+                "url": "https://iframe.chinapost.com.cn/jsp/util/Search.jsp",
+                "headers": {'Content-Type': 'application/json;charset=UTF-8'},
+                "params": {"community": "ChinaPostJT", "lucenelist": "1813902036", "q": "{keyword}"},
+            },
+            "rows": ("data",),
+            "title": "title",
+            "title_strip": re.compile(r'</?b>|/'),
+            "time": "time",
+            "link": "https://www.chinapost.com.cn{url}",
+        },
+        "key_env": "key_jk",
+        "lookback": "day",
+        "concurrency": 4,
+        "delay": 0,
+        "enabled": True,
+    },
+    "ghcg": {
+        "com_key": "国和采购",
+        "host": "www.zgguohe.com",
+        "source": {
+            "home_url": "http://www.zgguohe.com/search.php",
+            "home_method": "POST",
+            "request": {
+                "method": "POST",
+                "url": "http://www.zgguohe.com/search.php",
+                "headers": {'Content-Type': 'application/x-www-form-urlencoded'},
+                "data": {"keyword": "{keyword}"},
+            },
+            "rows": ghcg_rows,
+            "digest": ghcg_region,
+            "title": "title",
+            "time": "published",
+            "link": "http://www.zgguohe.com/{href}",
+        },
+        "key_env": "key_jk",
+        "lookback": "day",
+        "concurrency": 2,
+        "delay": 0,
+        "enabled": True,
+    },
+    "ydzb": {
+        "com_key": "有德招标",
+        "host": "www.youde.net",
+        "source": {
+            "request": {
+                "method": "POST",
+                "url": "http://www.youde.net/yd_zbcg/portal/getArticleByType",
+                "headers": {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'},
+                "data": {"title": "{keyword}"},
+            },
+            "rows": ("obj", "rows"),
+            "title": "title",
+            "time": "publishedTime",
+            "link": "http://www.youde.net/yd_zbcg/portal/toDetail?articleId={articleId}",
+        },
+        "key_env": "key_jk",
+        "lookback": timedelta(minutes=20),
+        "concurrency": 2,
+        "delay": 0,
+        "enabled": True,
+    },
+    "dlny": {
+        "com_key": "能力电源",
+        "host": "www.dlnyzb.com",
+        "source": {
+            # 数据接口路径里的 buildId 随站点部署变化，由 NextBuild 缓存并在 404 时自动更新
+            "build": NextBuild("dlny", "https://www.dlnyzb.com/search", seed="f755e5d5e6b34b16e8ab8b5bad6b19f65959f716"),
+            "request": {
+                "method": "POST",
+                "url": "search.json",
+                "headers": {'Content-Type': 'application/json; charset=UTF-8'},
+                "params": {"kw": "{keyword}", "rg": 2},
+            },
+            "rows": dlny_rows,
+            "title": "title",
+            # 括号注释和 HTML 高亮标签
+            "title_strip": re.compile(r'\([^()]*\)|（[^（）]*）|<[^>]*>'),
+            "time": "noticeTime",
+            "time_unit": "ms",
+            "link": "https://www.dlnyzb.com/detail/{articleId}",
+        },
+        "key_env": "key_jk",
+        "lookback": timedelta(days=1),
+        "concurrency": 1,
+        "delay": 120,
+        "not_extra": ["电信", "中核浙能2025年培训工程师技能提升培训成交候选人公示", "中核浙能2025-2026年福清培训人员职业健康体检项目采购公告", "延吉市人民法院审判执行辅助服务项目中标结果公告"],
+        "enabled": True,
+    },
+    "gept": {
+        "com_key": "国e平台",
+        "host": "www.ebidding.com",
+        "source": {
+            "request": {
+                "method": "POST",
+                "url": "https://www.ebidding.com/.rest/delivery/announcement/",
+                "headers": {
+                    'Content-Type': 'application/json;charset=UTF-8',
+                    "Referer": "https://www.ebidding.com/e-portal/business.html",
+                },
+                "params": {
+                    "isAirport[null]": "true",
+                    "searchContent[like]": "%{keyword}%",
+                    "showDate[lte]": gept_date(),
+                    "availDate[gte]": gept_date(181),
+                    "orderBy": "showDate desc",
+                    "offset": "0",
+                    "limit": "9"
+                },
+            },
+            "rows": ("results",),
+            "title": "title",
+            "time": "bidOpenTime",
+            "link": "https://www.ebidding.com/e-portal/business/detail.html?id={pkId}",
+            # 按开标日期过滤
+            "bound": "day",
+        },
+        "key_env": "key_jk",
+        "lookback": timedelta(days=2),
+        "concurrency": 1,
+        "delay": 5,
+        "enabled": False,
+    },
+}
+
+for _name, _site in SITES.items():
+    _site.setdefault("search", partial(search_source, _name))
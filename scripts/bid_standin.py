@@ -0,0 +1,560 @@
+import os
+import re
+import sys
+import json
+import time
+import html
+import math
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from datetime import datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bid_common import BASE_DIR, BEIJING_TZ, load_config, set_transport, retry_strategy
+from bid_notify import WECOM_MAX_BYTES, WECOM_RATE, WECOM_PERIOD
+
+# 替身服务器地址的环境变量：设置后引擎（含监督进程的各工作进程）的站点请求和 webhook 都发往替身
+STANDIN_ENV = "BID_STANDIN"
+DEFAULT_PORT = 8765
+# 每个公告流保留多久的历史（秒），需覆盖最长的回看窗口（gept 两天）
+RETENTION = 3 * 24 * 3600
+# 默认发布速率（条/分钟，每个站点每个公告类型一个流）
+DEFAULT_RATE = 2.0
+# 不翻页的站点每次返回的条数；翻页站点按请求的页长，但不超过 MAX_PAGE_SIZE
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# 标题命中关键词的比例，其余为无关公告
+HIT_RATIO = 0.3
+# 企业微信返回的 errcode：频率超限、内容超长、key 无效
+ERRCODE_RATE_LIMIT = 45009
+ERRCODE_TOO_LONG = 40058
+ERRCODE_BAD_KEY = 93000
+# Next.js 站点当前的 buildId；请求其他 buildId 返回 404，走引擎的重新发现流程
+BUILD_ID = "standin"
+# 站点放大时副本主机名的前缀：x3.caigou.chinatelecom.com.cn 按原站点的响应格式应答，但是独立的公告流
+CLONE_PREFIX = re.compile(r"^x\d+\.")
+TITLE_HEADS = ("关于2026年", "某集团", "某分公司", "某省公司", "")
+TITLE_TAILS = ("服务项目采购公告", "项目中标候选人公示", "项目竞争性磋商公告", "框架采购项目结果公示")
+NOISE = ("办公用品", "车辆维修", "物业管理", "食堂外包", "绿化养护", "安保服务", "印刷品", "网络设备")
+
+
+def parse_latency(spec):
+    """延迟分布（毫秒）：fixed:MS、uniform:LO-HI、exp:MEAN、lognormal:MEDIAN,SIGMA；返回 rng -> 秒"""
+    kind, _, value = spec.partition(":")
+    if kind == "fixed":
+        ms = float(value)
+        return lambda rng: ms / 1000
+    if kind == "uniform":
+        lo, hi = (float(v) for v in value.split("-"))
+        return lambda rng: rng.uniform(lo, hi) / 1000
+    if kind == "exp":
+        mean = float(value)
+        return lambda rng: rng.expovariate(1 / mean) / 1000 if mean > 0 else 0
+    if kind == "lognormal":
+        median, sigma = (float(v) for v in value.split(","))
+        return lambda rng: rng.lognormvariate(math.log(median), sigma) / 1000
+    raise ValueError(f"无法识别的延迟分布: {spec}")
+
+
+def scale_keywords(keyword_list, factor):
+    """关键词放大 factor 倍：原词之外追加 "原词+序号" 的变体，替身的标题也从这份列表里取"""
+    scaled = list(keyword_list)
+    for i in range(1, factor):
+        scaled += [f"{keyword}{i}" for keyword in keyword_list]
+    return scaled
+
+
+class Stream:
+    """一个站点（一个公告类型）的合成公告流：发布间隔服从指数分布（泊松过程），
+    启动时回填 RETENTION 的历史，之后按请求时刻补齐，按发布时间倒序查询"""
+    def __init__(self, rate, keywords, seed, hit_ratio=HIT_RATIO, now=None):
+        self.rate = rate / 60
+        self.keywords = keywords
+        self.hit_ratio = hit_ratio
+        self.random = random.Random(seed)
+        self.items = deque()        # (id, ts, title)，按时间升序
+        self.next_id = 1
+        now = now or time.time()
+        self.next_ts = now - RETENTION
+        self.lock = threading.Lock()
+        self.advance(now)
+
+    def title(self):
+        if self.keywords and self.random.random() < self.hit_ratio:
+            subject = self.random.choice(self.keywords)
+        else:
+            subject = self.random.choice(NOISE)
+        return self.random.choice(TITLE_HEADS) + subject + self.random.choice(TITLE_TAILS)
+
+    def advance(self, now):
+        if self.rate <= 0:
+            return
+        while self.next_ts <= now:
+            self.items.append((self.next_id, self.next_ts, self.title()))
+            self.next_id += 1
+            self.next_ts += self.random.expovariate(self.rate)
+        while self.items and self.items[0][1] < now - RETENTION:
+            self.items.popleft()
+
+    def query(self, keyword, offset, size):
+        """标题包含 keyword（空则不限）的公告，最新的在前，取 [offset, offset + size)"""
+        with self.lock:
+            self.advance(time.time())
+            result = []
+            for item in reversed(self.items):
+                if keyword and keyword not in item[2]:
+                    continue
+                if offset:
+                    offset -= 1
+                    continue
+                result.append(item)
+                if len(result) >= size:
+                    break
+            return result
+
+
+def beijing_text(ts, date_only=False):
+    moment = datetime.fromtimestamp(ts, BEIJING_TZ)
+    return moment.strftime("%Y-%m-%d" if date_only else "%Y-%m-%d %H:%M:%S")
+
+
+def as_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# 各站点的响应格式：(替身, 主机, 方法, 路径, 查询参数, 请求体) -> (状态码, Content-Type, 响应体)
+def zgdx_shape(standin, host, method, path, query, body):
+    if not path.endswith("/queryListNew"):
+        return standin.home()
+    form = json.loads(body or b"{}")
+    size = min(as_int(form.get("pageSize"), 10), standin.max_page_size)
+    offset = (as_int(form.get("pageNum"), 1) - 1) * size
+    items = standin.stream(host, form.get("type", "")).query(form.get("title", ""), offset, size)
+    rows = [{"docTitle": title, "docType": "采购公告", "docId": str(id), "docTypeCode": "c",
+             "securityViewCode": "v", "createDate": beijing_text(ts)} for id, ts, title in items]
+    return standin.json({"code": 200, "data": {"pageInfo": {"list": rows}}})
+
+
+def zgtt_shape(standin, host, method, path, query, body):
+    if not path.endswith("/query-notice"):
+        return standin.home()
+    form = json.loads(body or b"{}")
+    size = min(as_int(form.get("size"), 20), standin.max_page_size)
+    offset = (as_int(form.get("current"), 1) - 1) * size
+    items = standin.stream(host, form.get("purchaseNoticeType", "")).query(form.get("noticeTitle", ""), offset, size)
+    rows = [{"noticeTitle": title, "noticeId": str(id), "createTime": beijing_text(ts)} for id, ts, title in items]
+    return standin.json({"code": 200, "data": {"records": rows}})
+
+
+def zgyz_shape(standin, host, method, path, query, body):
+    keyword = query.get("q", "")
+    items = standin.stream(host).query(keyword, 0, standin.page_size)
+    rows = [{"title": title.replace(keyword, f"<b>{keyword}</b>") if keyword else title,
+             "url": f"/html1/report/{id}.html", "time": beijing_text(ts, date_only=True)} for id, ts, title in items]
+    return standin.json({"count": len(rows), "data": rows})
+
+
+def ghcg_shape(standin, host, method, path, query, body):
+    keyword = dict(parse_qsl((body or b"").decode("utf-8"))).get("keyword", "")
+    items = standin.stream(host).query(keyword, 0, standin.page_size) if keyword else []
+    rows = "".join(
+        f'<li><span class="fr">{beijing_text(ts, date_only=True)}</span>'
+        f'<a href="show.php?id={id}" target="_blank">{html.escape(title)}</a></li>'
+        for id, ts, title in items
+    )
+    page = ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>搜索</title></head><body>'
+            f'<div class="g_main"><div class="g_ryzs"><ul class="g_bule">{rows}</ul></div></div></body></html>')
+    return 200, "text/html; charset=utf-8", page.encode("utf-8")
+
+
+def ydzb_shape(standin, host, method, path, query, body):
+    keyword = dict(parse_qsl((body or b"").decode("utf-8"))).get("title", "")
+    items = standin.stream(host).query(keyword, 0, standin.page_size)
+    rows = [{"title": title, "articleId": str(id), "publishedTime": beijing_text(ts)} for id, ts, title in items]
+    return standin.json({"success": True, "obj": {"rows": rows}})
+
+
+def dlny_shape(standin, host, method, path, query, body):
+    if not path.startswith("/_next/data/"):
+        page = f'<html><body><script id="__NEXT_DATA__" type="application/json">{{"buildId":"{BUILD_ID}"}}</script></body></html>'
+        return 200, "text/html; charset=utf-8", page.encode("utf-8")
+    if path.split("/")[3] != BUILD_ID:
+        return 404, "text/plain", b"not found"
+    items = standin.stream(host).query(query.get("kw", ""), 0, standin.page_size)
+    articles = [{"articleId": id, "title": title, "noticeTime": int(ts * 1000)} for id, ts, title in items]
+    state = {"searchArticlesList": {"loading": False, "data": {"total": len(articles), "articles": articles}}}
+    return standin.json({"pageProps": {"initialState": state}, "__N_SSP": True})
+
+
+def gept_shape(standin, host, method, path, query, body):
+    keyword = query.get("searchContent[like]", "").strip("%")
+    items = standin.stream(host).query(keyword, 0, min(as_int(query.get("limit"), 9), standin.max_page_size))
+    rows = [{"title": title, "pkId": str(id), "bidOpenTime": beijing_text(ts)} for id, ts, title in items]
+    return standin.json({"results": rows})
+
+
+SHAPES = {
+    "caigou.chinatelecom.com.cn": zgdx_shape,
+    "www.tower.com.cn": zgtt_shape,
+    "iframe.chinapost.com.cn": zgyz_shape,
+    "www.zgguohe.com": ghcg_shape,
+    "www.youde.net": ydzb_shape,
+    "www.dlnyzb.com": dlny_shape,
+    "www.ebidding.com": gept_shape,
+}
+
+
+class WeComLimiter:
+    """按机器人 key 模拟企业微信的限制：内容不超过 WECOM_MAX_BYTES 字节，每 WECOM_PERIOD 秒最多 WECOM_RATE 条"""
+    def __init__(self, rate=WECOM_RATE, period=WECOM_PERIOD, max_bytes=WECOM_MAX_BYTES):
+        self.rate = rate
+        self.period = period
+        self.max_bytes = max_bytes
+        self.sent = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def handle(self, key, body):
+        if not key:
+            return {"errcode": ERRCODE_BAD_KEY, "errmsg": "invalid webhook url"}
+        try:
+            payload = json.loads(body or b"{}")
+            content = payload["text"]["content"]
+        except (ValueError, KeyError, TypeError):
+            return {"errcode": 40008, "errmsg": "invalid message type"}
+        with self.lock:
+            stats = self.stats.setdefault(key, {"ok": 0, "rate_limited": 0, "too_long": 0, "bytes": 0})
+            if len(content.encode("utf-8")) > self.max_bytes:
+                stats["too_long"] += 1
+                return {"errcode": ERRCODE_TOO_LONG, "errmsg": f"content exceed max length {self.max_bytes}"}
+            now = time.monotonic()
+            sent = self.sent.setdefault(key, deque())
+            while sent and sent[0] <= now - self.period:
+                sent.popleft()
+            if len(sent) >= self.rate:
+                stats["rate_limited"] += 1
+                return {"errcode": ERRCODE_RATE_LIMIT, "errmsg": "api freq out of limit"}
+            sent.append(now)
+            stats["ok"] += 1
+            stats["bytes"] += len(content.encode("utf-8"))
+        return {"errcode": 0, "errmsg": "ok"}
+
+
+class Standin:
+    """替身服务器的状态：各主机的公告流、延迟与错误注入、webhook 限制和请求计数"""
+    def __init__(self, keywords, rate=DEFAULT_RATE, site_rates=None, latency="fixed:0", site_latency=None,
+                 page_size=DEFAULT_PAGE_SIZE, max_page_size=MAX_PAGE_SIZE, error_rate=0.0, seed=0):
+        self.keywords = keywords
+        self.rate = rate
+        self.site_rates = site_rates or {}
+        self.latency = parse_latency(latency)
+        self.site_latency = {host: parse_latency(spec) for host, spec in (site_latency or {}).items()}
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.error_rate = error_rate
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.streams = {}
+        self.requests = {}
+        self.wecom = WeComLimiter()
+        self.lock = threading.Lock()
+
+    def stream(self, host, type=""):
+        key = (host, str(type))
+        stream = self.streams.get(key)
+        if stream is None:
+            with self.lock:
+                stream = self.streams.get(key)
+                if stream is None:
+                    rate = self.site_rates.get(CLONE_PREFIX.sub("", host), self.rate)
+                    stream = self.streams[key] = Stream(rate, self.keywords, f"{self.seed}:{host}:{type}")
+        return stream
+
+    def home(self):
+        return 200, "text/html; charset=utf-8", b"<html><body>standin</body></html>"
+
+    def json(self, data):
+        return 200, "application/json;charset=UTF-8", json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def delay(self, host):
+        with self.lock:
+            self.requests[host] = self.requests.get(host, 0) + 1
+            sample = self.site_latency.get(CLONE_PREFIX.sub("", host), self.latency)(self.random)
+            failed = self.random.random() < self.error_rate
+        if sample > 0:
+            time.sleep(sample)
+        return failed
+
+    def handle(self, method, target, body):
+        """target 为 /<原主机><原路径>?<查询>"""
+        parts = urlsplit(target)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        path = "/" + path
+        query = dict(parse_qsl(parts.query))
+        if host == "qyapi.weixin.qq.com":
+            return self.json(self.wecom.handle(query.get("key"), body))
+        if self.delay(host):
+            return 503, "text/plain", b"injected error"
+        shape = SHAPES.get(CLONE_PREFIX.sub("", host))
+        if shape is None:
+            return self.home()
+        return shape(self, host, method, unquote(path), query, body)
+
+    def stats(self):
+        with self.lock:
+            requests_by_host = dict(self.requests)
+            streams = {f"{host}|{type}": len(stream.items) for (host, type), stream in self.streams.items()}
+        with self.wecom.lock:
+            webhook = {key: dict(stats) for key, stats in self.wecom.stats.items()}
+        return {"requests": requests_by_host, "streams": streams, "webhook": webhook}
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    # 保持长连接，与真实站点一样复用客户端连接池
+    protocol_version = "HTTP/1.1"
+    standin = None
+
+    def respond(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.path == "/_standin/stats":
+            self.respond(*self.standin.json(self.standin.stats()))
+            return
+        try:
+            self.respond(*self.standin.handle(self.command, self.path, body))
+        except Exception as e:
+            self.respond(500, "text/plain", f"standin error: {e}".encode("utf-8"))
+
+    do_GET = handle_request
+    do_POST = handle_request
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(standin, port=DEFAULT_PORT, host="127.0.0.1"):
+    handler = type("Handler", (StandinHandler,), {"standin": standin})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class StandinAdapter(HTTPAdapter):
+    """把请求改发到替身服务器：https://<主机>/<路径> -> <替身>/<主机>/<路径>，重试策略与线上一致"""
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/")
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        routed = request.copy()
+        routed.url = f"{self.base_url}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        # 代理设置是按原 URL 算出来的，发往本机替身时不走代理
+        kwargs["proxies"] = {}
+        return super().send(routed, **kwargs)
+
+
+def use_standin(base_url):
+    """之后创建的站点会话和 webhook 都发往替身服务器"""
+    set_transport(lambda name: StandinAdapter(base_url, pool_connections=4, pool_maxsize=16, max_retries=retry_strategy))
+
+
+def clone_host(url, i):
+    parts = urlsplit(url)
+    return url.replace(parts.netloc, f"x{i}.{parts.netloc}", 1)
+
+
+def clone_sites(sites, factor):
+    """每个站点再复制 factor - 1 份：主机名加 x<i>. 前缀，替身按原站点的格式应答、各自独立的公告流，
+    引擎为每份副本单独限流、单独去重"""
+    from bid_sites import search_source
+    from bid_nextdata import NextBuild
+    names = []
+    for name in list(sites):
+        site = sites[name]
+        names.append(name)
+        for i in range(1, factor):
+            clone_name = f"{name}_{i}"
+            source = dict(site["source"])
+            source["request"] = dict(source["request"])
+            if "://" in source["request"]["url"]:
+                source["request"]["url"] = clone_host(source["request"]["url"], i)
+            if source.get("home_url"):
+                source["home_url"] = clone_host(source["home_url"], i)
+            if "build" in source:
+                build = source["build"]
+                source["build"] = NextBuild(clone_name, clone_host(build.page_url, i), seed=build.build_id, path=build.path)
+            sites[clone_name] = {
+                **site,
+                "com_key": f"{site['com_key']}{i}",
+                "host": f"x{i}.{site['host']}",
+                "source": source,
+                "search": partial(search_source, clone_name),
+            }
+            names.append(clone_name)
+    return names
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/_standin/stats", timeout=1, proxies={})
+            return True
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def parse_site_options(values):
+    """["dlny=0.5", ...] -> {原主机: 值}，站点名按 SITES 换成主机"""
+    from bid_sites import SITES
+    result = {}
+    for value in values or []:
+        name, _, spec = value.partition("=")
+        result[SITES[name]["host"] if name in SITES else name] = spec
+    return result
+
+
+def server_args(args):
+    """load 子命令启动替身子进程时原样传递的参数"""
+    argv = ["--port", str(args.port), "--rate", str(args.rate), "--latency", args.latency,
+            "--page-size", str(args.page_size), "--max-page-size", str(args.max_page_size),
+            "--error-rate", str(args.error_rate), "--seed", str(args.seed),
+            "--keywords-factor", str(args.keywords_factor)]
+    for value in args.site_rate or []:
+        argv += ["--site-rate", value]
+    for value in args.site_latency or []:
+        argv += ["--site-latency", value]
+    return argv
+
+
+def run_serve(args):
+    keyword_list, _, _ = load_config()
+    standin = Standin(
+        scale_keywords(keyword_list, args.keywords_factor),
+        rate=args.rate,
+        site_rates={host: float(v) for host, v in parse_site_options(args.site_rate).items()},
+        latency=args.latency,
+        site_latency=parse_site_options(args.site_latency),
+        page_size=args.page_size,
+        max_page_size=args.max_page_size,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    server = serve(standin, args.port, args.host)
+    print(f"替身服务器: http://{args.host}:{server.server_port}  （{STANDIN_ENV}=http://{args.host}:{server.server_port}）", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def run_load(args):
+    """替身服务器在子进程里运行（不与引擎争用 GIL），引擎按放大后的站点和关键词跑 minutes 分钟后汇总"""
+    from bid_engine import Engine
+    from bid_sites import SITES
+    from bid_store import SeenStore
+    from bid_schedule import PollScheduler
+    from bid_metrics import CYCLE_SECONDS, ITEMS
+    from bid_replay import isolate
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve"] + server_args(args), cwd=BASE_DIR)
+    try:
+        if not wait_until_up(base_url):
+            print("替身服务器未能启动")
+            return
+        use_standin(base_url)
+        workdir = tempfile.mkdtemp(prefix="bid_load_")
+        isolate(workdir)
+        base_names = args.sites or [name for name, site in SITES.items() if site["enabled"]]
+        sites = {name: SITES[name] for name in base_names}
+        site_names = clone_sites(sites, args.sites_factor)
+        SITES.update(sites)
+        for name in site_names:
+            os.environ.setdefault(SITES[name]["key_env"], f"standin-{SITES[name]['key_env']}")
+            if args.no_delay:
+                SITES[name]["delay"] = 0
+        engine = Engine(site_names, hours=args.minutes / 60, store=SeenStore(os.path.join(workdir, "bid_seen.db")),
+                        scheduler=PollScheduler(os.path.join(workdir, "bid_rates.json")))
+        engine.keyword_list = scale_keywords(engine.keyword_list, args.keywords_factor)
+        print(f"压测: {len(site_names)} 个站点，{len(engine.keyword_list)} 个关键词，{args.minutes} 分钟")
+        started = time.monotonic()
+        asyncio.run(engine.run())
+        elapsed = time.monotonic() - started
+        stats = requests.get(f"{base_url}/_standin/stats", timeout=10, proxies={}).json()
+    finally:
+        server.terminate()
+        server.wait()
+    cycles = {sample["labels"]["site"]: sample for sample in CYCLE_SECONDS.snapshot()}
+    notified = {}
+    for sample in ITEMS.snapshot():
+        if sample["labels"]["stage"] == "notified":
+            site = sample["labels"]["site"]
+            notified[site] = notified.get(site, 0) + sample["value"]
+    print(f"{'站点':<10} {'轮数':>6} {'平均轮次 s':>10} {'请求数':>8} {'推送条数':>8}")
+    for name in site_names:
+        sample = cycles.get(name, {"count": 0, "sum": 0})
+        mean = sample["sum"] / sample["count"] if sample["count"] else 0
+        print(f"{name:<10} {sample['count']:>6} {mean:>10.2f} {stats['requests'].get(SITES[name]['host'], 0):>8} {notified.get(name, 0):>8}")
+    print(f"总耗时 {elapsed:.0f} 秒，替身共处理 {sum(stats['requests'].values())} 个请求")
+    for key, webhook in stats["webhook"].items():
+        print(f"webhook {key}: 成功 {webhook['ok']}，频率超限 {webhook['rate_limited']}，超长 {webhook['too_long']}，{webhook['bytes']} 字节")
+
+
+def add_server_options(parser):
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="每个公告流的发布速率（条/分钟）")
+    parser.add_argument("--site-rate", action="append", help="按站点覆盖发布速率，如 dlny=0.2，可重复")
+    parser.add_argument("--latency", default="fixed:0", help="响应延迟分布（毫秒）：fixed:MS / uniform:LO-HI / exp:MEAN / lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--site-latency", action="append", help="按站点覆盖延迟分布，如 ghcg=lognormal:800,0.6，可重复")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="不翻页站点每次返回的条数")
+    parser.add_argument("--max-page-size", type=int, default=MAX_PAGE_SIZE, help="翻页站点的页长上限")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="站点接口返回 503 的概率")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("--keywords-factor", type=int, default=1, help="关键词放大倍数（替身标题与引擎查询一致）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WinBid 替身服务器：本机模拟各采购站点接口和企业微信 webhook，用于压测")
+    sub = parser.add_subparsers(dest="command", required=True)
+    srv = sub.add_parser("serve", help=f"启动替身服务器；引擎设置 {STANDIN_ENV} 或 --standin 后发往这里")
+    add_server_options(srv)
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.set_defaults(func=run_serve)
+    load = sub.add_parser("load", help="启动替身服务器并以放大的站点数、关键词数运行引擎，汇总轮次耗时和推送情况")
+    load.add_argument("sites", nargs="*", help="站点列表，默认全部启用的站点")
+    add_server_options(load)
+    load.add_argument("--sites-factor", type=int, default=1, help="站点放大倍数")
+    load.add_argument("--minutes", type=float, default=5, help="运行时长（分钟）")
+    load.add_argument("--no-delay", action="store_true", help="忽略站点配置的请求间隔（delay）")
+    load.set_defaults(func=run_load)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,181 @@
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque
+
+from bid_common import BASE_DIR
+
+logger = logging.getLogger()
+
+STORE_FILE = os.path.join(BASE_DIR, "output", "bid_seen.db")
+# 已推送记录的保留时间，需大于各站点最长的回看窗口
+SEEN_TTL = 7 * 24 * 3600
+# SQLite 单条语句的参数上限
+BATCH_SIZE = 500
+# 内存过滤器默认参数：时间窗口切成几片、每片容量、整体误判率
+FILTER_SLICES = 4
+FILTER_CAPACITY = 10000
+FILTER_FP_RATE = 1e-6
+MASK64 = (1 << 64) - 1
+
+
+class SeenStore:
+    """进程间共享的已推送记录（SQLite WAL），按公告整数 id O(1) 查询，按轮批量写入，按时间过期。
+    引擎在线程池里调用，连接跨线程共享，用锁串行化"""
+    def __init__(self, path=STORE_FILE, ttl=SEEN_TTL):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_ids ("
+            "id INTEGER PRIMARY KEY, site TEXT, title TEXT, seen_at INTEGER)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS seen_ids_at_idx ON seen_ids(seen_at)")
+        self.conn.commit()
+
+    def seen(self, ids):
+        """批量查询，返回已存在的主键集合"""
+        ids = list(ids)
+        found = set()
+        with self.lock:
+            for i in range(0, len(ids), BATCH_SIZE):
+                batch = ids[i:i + BATCH_SIZE]
+                marks = ",".join("?" * len(batch))
+                rows = self.conn.execute(f"SELECT id FROM seen_ids WHERE id IN ({marks})", batch)
+                found.update(row[0] for row in rows)
+        return found
+
+    def add_many(self, items):
+        """items: [(Announcement.id, site, title)]，一轮结束后一次事务写入"""
+        if not items:
+            return
+        now = int(time.time())
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO seen_ids (id, site, title, seen_at) VALUES (?, ?, ?, ?)",
+                [(bid_id, site, title, now) for bid_id, site, title in items]
+            )
+
+    def expire(self):
+        """删除超过保留时间的记录，返回删除条数"""
+        with self.lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM seen_ids WHERE seen_at < ?", (int(time.time()) - self.ttl,))
+        return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class CursorStore:
+    """每个 (站点, 类型, 查询) 的高水位游标：记录已抓到的最新公告时间（epoch 秒）。
+    适配器在线程池里调用，连接跨线程共享，用锁串行化"""
+    def __init__(self, path=STORE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cursors ("
+                "site TEXT, type TEXT, query TEXT, newest INTEGER, updated_at INTEGER, "
+                "PRIMARY KEY (site, type, query))"
+            )
+
+    def get(self, site, type, query):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT newest FROM cursors WHERE site = ? AND type = ? AND query = ?", (site, type, query)
+            ).fetchone()
+        return row[0] if row else None
+
+    def advance(self, site, type, query, newest):
+        """只前进不后退"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO cursors (site, type, query, newest, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (site, type, query) DO UPDATE SET "
+                "newest = MAX(newest, excluded.newest), updated_at = excluded.updated_at",
+                (site, type, query, int(newest), int(time.time()))
+            )
+
+
+_cursor_store = None
+_cursor_lock = threading.Lock()
+
+
+def get_cursor_store():
+    global _cursor_store
+    if _cursor_store is None:
+        with _cursor_lock:
+            if _cursor_store is None:
+                _cursor_store = CursorStore()
+    return _cursor_store
+
+
+def set_cursor_store(path):
+    """游标改存到 path（自带去重库的入口、回放基准的临时目录）"""
+    global _cursor_store
+    with _cursor_lock:
+        _cursor_store = CursorStore(path)
+
+
+class BloomSlice:
+    def __init__(self, capacity, fp_rate):
+        self.bits = max(64, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+        self.created = time.monotonic()
+
+    def positions(self, h1, h2):
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, h1, h2):
+        for pos in self.positions(h1, h2):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, hashes):
+        h1, h2 = hashes
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self.positions(h1, h2))
+
+
+class SeenFilter:
+    """按时间分片轮转的布隆过滤器：内存固定，超过时间窗口的记录自动老化。
+    窗口切成 slices 片，每片写满 window/slices 秒或 capacity 条后新开一片并丢弃最老的一片"""
+    def __init__(self, window, slices=FILTER_SLICES, capacity=FILTER_CAPACITY, fp_rate=FILTER_FP_RATE):
+        self.span = window / slices
+        self.capacity = capacity
+        # 查询要检查全部分片，单片误判率取整体的 1/slices
+        self.slice_fp_rate = fp_rate / slices
+        self.slices = deque(maxlen=slices)
+        self.slices.append(BloomSlice(capacity, self.slice_fp_rate))
+
+    @staticmethod
+    def hash(bid_id):
+        """bid_id 本身已是 64 位哈希，第二个哈希用 splitmix64 混合得到"""
+        h1 = bid_id & MASK64
+        h2 = (h1 ^ (h1 >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+        h2 = (h2 ^ (h2 >> 27)) * 0x94D049BB133111EB & MASK64
+        return h1, (h2 ^ (h2 >> 31)) | 1
+
+    def rotate(self):
+        current = self.slices[-1]
+        if time.monotonic() - current.created >= self.span or current.count >= self.capacity:
+            self.slices.append(BloomSlice(self.capacity, self.slice_fp_rate))
+
+    def add(self, bid_id):
+        self.rotate()
+        self.slices[-1].add(*self.hash(bid_id))
+
+    def __contains__(self, bid_id):
+        hashes = self.hash(bid_id)
+        return any(hashes in s for s in self.slices)
@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import multiprocessing
+
+# 预加载：父进程先导入引擎和站点适配器（requests、lxml 等），fork 出的工作进程以写时复制方式共享这些内存页
+import bid_engine
+from bid_common import LOG_DIR, setup_logging, get_user_agent_pool
+from bid_sites import SITES
+
+logger = logging.getLogger()
+
+HANDOFF_DIR = os.path.join(LOG_DIR, "handoff")
+# 工作进程的寿命（小时）：到期后正常退出，会话写入交接文件，监督进程立即换新
+WORKER_HOURS = bid_engine.DEFAULT_HOURS
+# 异常退出后的重启退避（秒）：BACKOFF_BASE * 2^连续失败次数，不超过 BACKOFF_MAX；
+# 连续运行超过 STABLE_AFTER 秒后失败次数清零
+BACKOFF_BASE = 5
+BACKOFF_MAX = 600
+STABLE_AFTER = 300
+# 停止时等待工作进程收尾（发送汇总、写交接文件）的时间（秒），超时强制结束
+STOP_TIMEOUT = 120
+# 检查工作进程状态的间隔（秒）
+POLL_INTERVAL = 1
+
+
+def worker_main(name, hours, metrics_port=None):
+    """工作进程入口：单站点引擎，SIGTERM 由引擎处理（收尾后退出），Ctrl-C 交给监督进程统一处理"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # fork 继承了监督进程的日志 handler，换成工作进程自己的日志文件
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handoff = os.path.join(HANDOFF_DIR, f"{name}.json")
+    bid_engine.run([name], hours=hours, log_name=f"worker_{name}", handoff=handoff, metrics_port=metrics_port)
+
+
+class Worker:
+    def __init__(self, name, metrics_port=None):
+        self.name = name
+        self.metrics_port = metrics_port
+        self.process = None
+        self.started = 0
+        self.failures = 0
+        self.restart_at = 0
+
+
+class Supervisor:
+    """每个站点一个常驻工作进程：崩溃按指数退避重启，寿命到期时轮换，
+    轮换前后通过交接文件传递 cookie / User-Agent，去重、游标、发布速率本就在磁盘上共享"""
+    def __init__(self, site_names, hours=WORKER_HOURS, metrics_port=None):
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        # 每个工作进程一个指标端口：metrics_port + 序号
+        self.workers = [
+            Worker(name, None if metrics_port is None else metrics_port + i)
+            for i, name in enumerate(site_names)
+        ]
+        self.hours = hours
+        self.stopping = False
+
+    def request_stop(self, signum, frame):
+        logger.info(f"监督进程收到信号 {signum}，准备停止")
+        self.stopping = True
+
+    def start(self, worker):
+        worker.process = self.context.Process(
+            target=worker_main, args=(worker.name, self.hours, worker.metrics_port), name=f"bid-{worker.name}"
+        )
+        worker.process.start()
+        worker.started = time.monotonic()
+        logger.info(f"{worker.name}，启动工作进程 pid={worker.process.pid}")
+
+    def reap(self, worker):
+        code = worker.process.exitcode
+        lived = time.monotonic() - worker.started
+        worker.process = None
+        if code == 0:
+            logger.info(f"{worker.name}，工作进程到期退出（运行 {lived:.0f} 秒），立即轮换")
+            worker.failures = 0
+            worker.restart_at = 0
+            return
+        if lived > STABLE_AFTER:
+            worker.failures = 0
+        delay = min(BACKOFF_BASE * 2 ** worker.failures, BACKOFF_MAX)
+        worker.failures += 1
+        worker.restart_at = time.monotonic() + delay
+        logger.error(f"{worker.name}，工作进程异常退出 exitcode={code}（运行 {lived:.0f} 秒），{delay} 秒后重启")
+
+    def run(self, total_hours=None):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        deadline = None if total_hours is None else time.monotonic() + total_hours * 3600
+        try:
+            while not self.stopping and (deadline is None or time.monotonic() < deadline):
+                for worker in self.workers:
+                    if worker.process is not None and not worker.process.is_alive():
+                        worker.process.join()
+                        self.reap(worker)
+                    if worker.process is None and time.monotonic() >= worker.restart_at:
+                        self.start(worker)
+                time.sleep(POLL_INTERVAL)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """通知所有工作进程收尾退出，超时未退出的强制结束"""
+        running = [worker for worker in self.workers if worker.process is not None and worker.process.is_alive()]
+        for worker in running:
+            worker.process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for worker in running:
+            worker.process.join(max(0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.error(f"{worker.name}，工作进程 {STOP_TIMEOUT} 秒内未退出，强制结束")
+                worker.process.kill()
+                worker.process.join()
+        logger.info("监督进程已停止")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WinBid 监督进程：每个站点一个工作进程，常驻运行")
+    parser.add_argument("sites", nargs="*", help=f"站点列表，可选 {'/'.join(SITES)}，默认全部启用的站点")
+    parser.add_argument("--hours", type=float, default=WORKER_HOURS, help="工作进程寿命（小时），到期轮换")
+    parser.add_argument("--total", type=float, default=None, help="监督进程总运行时长（小时），默认一直运行")
+    parser.add_argument("--metrics-port", type=int, default=None, help="工作进程指标端口的起始值，依次 +1")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.sites if name not in SITES]
+    if unknown:
+        parser.error(f"未知站点: {unknown}")
+    site_names = args.sites or [name for name, site in SITES.items() if site["enabled"]]
+    setup_logging("supervisor")
+    # User-Agent 列表也在 fork 之前读入
+    get_user_agent_pool()
+    logger.info(f"监督进程启动，站点: {site_names}，工作进程寿命 {args.hours} 小时")
+    Supervisor(site_names, hours=args.hours, metrics_port=args.metrics_port).run(args.total)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
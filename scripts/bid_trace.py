@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# 追踪文件超过这个大小时轮换为 .1（只保留一个旧文件）
+TRACE_MAX_BYTES = 50 * 1024 * 1024
+
+# 当前轮次的上下文（cycle / site / type / keyword），asyncio 任务自动继承，
+# 进入线程池时用 carry() 带过去
+_fields = contextvars.ContextVar("bid_trace_fields", default={})
+
+
+def bind(**fields):
+    """在当前上下文追加字段，之后的 span 都带上这些字段"""
+    _fields.set({**_fields.get(), **fields})
+
+
+def current():
+    """当前上下文的字段（日志按其中的 site 分文件）"""
+    return _fields.get()
+
+
+def carry(func):
+    """把调用时的上下文带进线程池：每次调用在上下文的副本里执行"""
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(func, *args)
+
+
+class Tracer:
+    """JSON lines 写入器：每个 span 一行。热路径只把事件放进队列，由后台线程序列化、写入"""
+    def __init__(self):
+        self.path = None
+        self.file = None
+        self.events = None
+        self.thread = None
+
+    def open(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+        self.events = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.drain, args=(self.events,), name="bid-trace", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """写完队列里剩余的事件后关闭文件"""
+        if self.thread is None:
+            return
+        events, self.events = self.events, None
+        events.put(None)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
+        self.file = None
+
+    def write(self, event):
+        events = self.events
+        if events is not None:
+            events.put(event)
+
+    def drain(self, events):
+        """后台线程：取空队列才 flush 一次，None 表示停止"""
+        event = events.get()
+        while event is not None:
+            self.file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            try:
+                event = events.get_nowait()
+                continue
+            except queue.Empty:
+                pass
+            self.file.flush()
+            if self.file.tell() > TRACE_MAX_BYTES:
+                self.file.close()
+                os.replace(self.path, self.path + ".1")
+                self.file = open(self.path, 'a', encoding='utf-8')
+            event = events.get()
+        self.file.flush()
+
+
+TRACER = Tracer()
+
+
+def emit(stage, duration, **fields):
+    if TRACER.events is None:
+        return
+    event = {"ts": round(time.time(), 3), **_fields.get(), "stage": stage, "ms": round(duration * 1000, 3)}
+    event.update(fields)
+    TRACER.write(event)
+
+
+@contextmanager
+def span(stage, **fields):
+    """计时一个阶段；调用方可往 yield 出的 dict 里补充字段（如 bytes）"""
+    extra = {}
+    start = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        emit(stage, time.perf_counter() - start, **fields, **extra)
+
+
+class TimedIter:
+    """累计迭代器每次取下一项的耗时，用于把惰性解析和边解析边过滤的时间分开"""
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self.iterator)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+def summarize(path):
+    """按站点、阶段汇总追踪文件，并列出超出回看窗口的轮次"""
+    stages = {}
+    flagged = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            event = json.loads(line)
+            key = (event.get("site", ""), event["stage"])
+            total = stages.setdefault(key, [0, 0.0, 0])
+            total[0] += 1
+            total[1] += event["ms"]
+            total[2] += event.get("bytes", 0)
+            if event["stage"] == "cycle" and event.get("exceeded"):
+                flagged.append(event)
+    print(f"{'站点':<8} {'阶段':<10} {'次数':>8} {'合计 ms':>12} {'平均 ms':>10} {'字节':>12}")
+    for (site, stage), (count, ms, nbytes) in sorted(stages.items()):
+        print(f"{site:<8} {stage:<10} {count:>8} {ms:>12.1f} {ms / count:>10.1f} {nbytes:>12}")
+    print(f"超出回看窗口的轮次: {len(flagged)}")
+    for event in flagged:
+        print(f"  {event['cycle']} 耗时 {event['ms'] / 1000:.1f}s，距上轮 {event.get('since_last') or 0:.1f}s，回看窗口 {event['lookback']:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="汇总 WinBid 追踪文件（output/bid_trace_*.jsonl）")
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+    summarize(args.path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -5,7 +5,7 @@
 LOG_DIR="/root/scripts/output"
 
 # 查找并删除15天前的日志文件
-find "$LOG_DIR" -name "bid_log_*.log" -mtime +15 -exec rm -f {} \;
+find "$LOG_DIR" \( -name "bid_log_*.log" -o -name "bid_log_*.log.*.gz" \) -mtime +15 -exec rm -f {} \;
 
 # 记录清理操作
 echo "[$(date)] Deleted logs older than 15 days" >> "$LOG_DIR/cleanup_history.log"